@@ -3,6 +3,12 @@ from backend.config import get_settings
 from backend.ingestion.github_client import search_repos, fetch_readme
 from backend.ingestion.youtube_client import search_videos, fetch_transcript
 from backend.core.utils import write_parquet
+from backend.core.item_cache import item_cache
+from backend.core.faiss_registry import faiss_registry
+from backend.core.query_encoder import query_encoder
+from backend.core.embedding_store import embedding_store_stats
+from backend.core import startup
+from backend.recommender.cf_registry import cf_registry
 from backend.recommender.search import search
 from backend.recommender.builder import build_index
 import asyncio
@@ -17,6 +23,18 @@ def ping():
     return {"status": "ok"}
 
 
+@router.get("/stats")
+def stats():
+    return {
+        "item_cache": item_cache.stats(),
+        "faiss_registry": faiss_registry.stats(),
+        "query_encoder": query_encoder.stats(),
+        "embedding_store": embedding_store_stats(),
+        "cf_registry": cf_registry.stats(),
+        "startup": startup.report(),
+    }
+
+
 @router.post("/ingest")
 async def ingest(topic: str = Query(..., min_length=1)):
     max_per_source = min(settings.MAX_PER_SOURCE, 200)
@@ -25,11 +25,71 @@ class Settings(BaseSettings):
     # ----------- App Config ----------- #
     DATA_DIR: Path = Field(default=Path("./data/raw"))
     MAX_PER_SOURCE: int = Field(default=100, ge=1, le=10_000)
+    MONGO_BULK_CHUNK_SIZE: int = Field(default=1000, ge=1)
+    INDEX_CHUNK_SIZE: int = Field(default=1000, ge=1)
+    INDEX_CHECKPOINT_CHUNKS: int = Field(default=10, ge=1)
     
     RAW_DATA_DIR: Path = Field(default=Path("/data/raw"))
     FAISS_DIR: Path = Field(default=Path("/data/faiss"))
     MODEL_DIR: Path = Field(default=Path("/data/models"))
 
+    # ----------- Embeddings ----------- #
+    EMBEDDING_WARMUP: bool = Field(default=True)
+    # "torch" (SentenceTransformer) or "onnx" (export with scripts/export_onnx.py)
+    EMBEDDING_BACKEND: str = Field(default="torch", pattern="^(torch|onnx)$")
+    EMBEDDING_QUANTIZED: bool = Field(default=False)
+    # Intra-op threads per model instance (0 = library default)
+    EMBEDDING_THREADS: int = Field(default=0, ge=0)
+    # Processes used by bulk embedding (index builds, CF features)
+    EMBEDDING_WORKERS: int = Field(default=1, ge=1)
+    EMBEDDING_SHARD_SIZE: int = Field(default=256, ge=1)
+    EMBEDDING_PARALLEL_MIN_TEXTS: int = Field(default=512, ge=1)
+    # Persistent embedding cache (defaults to MODEL_DIR/embeddings)
+    EMBEDDING_CACHE: bool = Field(default=True)
+    EMBEDDING_CACHE_DIR: Optional[Path] = Field(default=None)
+
+    # ----------- Serving Caches ----------- #
+    ITEM_CACHE_SIZE: int = Field(default=10_000, ge=0)
+    ITEM_CACHE_TTL_SECONDS: float = Field(default=300.0, ge=0)
+    QUERY_CACHE_SIZE: int = Field(default=10_000, ge=0)
+    QUERY_BATCH_WINDOW_MS: float = Field(default=5.0, ge=0)
+    QUERY_BATCH_MAX: int = Field(default=64, ge=1)
+    FAISS_CACHE_MAX_BYTES: int = Field(default=2 * 1024**3, ge=0)
+    FAISS_RELOAD_CHECK_SECONDS: float = Field(default=1.0, ge=0)
+    FAISS_MMAP: bool = Field(default=False)
+
+    # ----------- FAISS Index Layout ----------- #
+    # Metric of new indexes: "ip" (cosine on normalized embeddings) or legacy "l2";
+    # existing indexes keep theirs until scripts/migrate_faiss_metric.py
+    FAISS_METRIC: str = Field(default="ip", pattern="^(ip|l2)$")
+    # Flat indexes are promoted to FAISS_ANN_INDEX past FAISS_ANN_THRESHOLD
+    FAISS_ANN_INDEX: str = Field(default="ivf_flat", pattern="^(flat|ivf_flat|ivf_pq|hnsw)$")
+    FAISS_ANN_THRESHOLD: int = Field(default=50_000, ge=1)
+    FAISS_MAX_TRAIN_POINTS: int = Field(default=100_000, ge=1)
+    FAISS_NPROBE: int = Field(default=16, ge=1)
+    FAISS_EF_SEARCH: int = Field(default=64, ge=1)
+    FAISS_PQ_M: int = Field(default=16, ge=1)
+    FAISS_HNSW_M: int = Field(default=32, ge=2)
+
+    # ----------- CF Training ----------- #
+    # Topics trained in parallel, and LightFM threads per topic (0 = cpu_count // workers)
+    CF_TRAIN_WORKERS: int = Field(default=2, ge=1)
+    CF_TRAIN_THREADS: int = Field(default=0, ge=0)
+    # Retrain once this many interactions are new / updated since the last run,
+    # or when any are and the last full fit is older than CF_RETRAIN_MAX_AGE_DAYS
+    CF_RETRAIN_MIN_NEW: int = Field(default=50, ge=1)
+    CF_RETRAIN_MAX_AGE_DAYS: float = Field(default=15.0, ge=0)
+    # Warm-start (fit_partial) updates between full fits; a full fit still
+    # runs when new interactions exceed CF_FULL_RETRAIN_RATIO of the total
+    CF_INCREMENTAL: bool = Field(default=True)
+    CF_UPDATE_EPOCHS: int = Field(default=3, ge=1)
+    CF_FULL_RETRAIN_RATIO: float = Field(default=0.2, ge=0)
+    # Model artifact versions kept on disk (the CURRENT one always is)
+    CF_KEEP_VERSIONS: int = Field(default=2, ge=1)
+    # Loaded CF models kept per serving process, and how often each checks for a new version
+    CF_CACHE_MAX_MODELS: int = Field(default=32, ge=1)
+    CF_RELOAD_CHECK_SECONDS: float = Field(default=5.0, ge=0)
+
     # ----------- Pydantic Settings ----------- #
     model_config = SettingsConfigDict(
         env_file=".env",
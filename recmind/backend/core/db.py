@@ -2,8 +2,10 @@ from __future__ import annotations
 from datetime import datetime
 from typing import Optional, List, Dict, Any
 from bson import ObjectId
-from pymongo import MongoClient, ASCENDING
+from pymongo import MongoClient, ASCENDING, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, OperationFailure
 from backend.config import get_settings
+from backend.core.item_cache import item_cache
 
 # ---------- Lazy Globals ----------
 _client: MongoClient | None = None
@@ -28,18 +30,64 @@ def _get_db():
     return _db
 
 
+def connect():
+    """
+    Connect and create indexes now instead of on first use (app startup).
+    """
+    _get_db()
+
+
 def _ensure_indexes(db):
     global _indexes_created
     if _indexes_created:
         return
 
     db.items.create_index([("topic", ASCENDING)])
+    # Ordered per-topic scans (CF training) walk this index without sorting
+    db.items.create_index([("topic", ASCENDING), ("_id", ASCENDING)])
+    try:
+        db.items.create_index(
+            [("numeric_id", ASCENDING)],
+            unique=True,
+            sparse=True,
+        )
+    except OperationFailure as e:
+        # Legacy data may contain colliding numeric ids; keep serving with a
+        # non-unique index until backfill_numeric_ids reports / fixes them.
+        print("numeric_id unique index failed, falling back:", repr(e))
+        db.items.create_index([("numeric_id", ASCENDING)])
+    try:
+        db.items.create_index(
+            [("topic", ASCENDING), ("source", ASCENDING), ("ext_id", ASCENDING)],
+            unique=True,
+        )
+    except OperationFailure as e:
+        # Items ingested before dedup may be duplicated; run dedupe_items.py
+        print("(topic, source, ext_id) unique index failed, falling back:", repr(e))
+        db.items.create_index(
+            [("topic", ASCENDING), ("source", ASCENDING), ("ext_id", ASCENDING)]
+        )
     db.interactions.create_index([("user_id", ASCENDING)])
     db.interactions.create_index([("item_id", ASCENDING)])
 
     _indexes_created = True
 
 
+def rebuild_unique_indexes():
+    """
+    Swap the non-unique fallback indexes created by _ensure_indexes for
+    unique ones, once duplicates have been cleaned up.
+    """
+    global _indexes_created
+    db = _get_db()
+    for name, spec in db.items.index_information().items():
+        keys = [k for k, _ in spec["key"]]
+        if keys in (["numeric_id"], ["topic", "source", "ext_id"]) and not spec.get("unique"):
+            db.items.drop_index(name)
+    _indexes_created = False
+    _ensure_indexes(db)
+
+
 # ---------- Collections ----------
 def _items_col():
     return _get_db()["items"]
@@ -49,68 +97,345 @@ def _interactions_col():
     return _get_db()["interactions"]
 
 
+def _counters_col():
+    return _get_db()["counters"]
+
+
 # ---------- Item Helpers ----------
+_ITEM_PROJECTION = {
+    "_id": 1,
+    "numeric_id": 1,
+    "source": 1,
+    "title": 1,
+    "url": 1,
+    "desc": 1,
+    "topic": 1,
+    "popularity": 1,
+}
+
+
 def get_items_by_ids(item_ids: List[str]) -> List[Dict[str, Any]]:
-    ids = [ObjectId(i) for i in item_ids if i]
-    return list(_items_col().find({"_id": {"$in": ids}}))
+    """
+    Item metadata docs for the given ObjectIds, served from the item cache
+    where possible. Order of the returned docs is not guaranteed.
+    """
+    found, missing = item_cache.get_many(str(i) for i in item_ids if i)
+    docs = list(found.values())
+
+    if missing:
+        fetched = list(
+            _items_col().find(
+                {"_id": {"$in": [ObjectId(i) for i in missing]}},
+                _ITEM_PROJECTION,
+            )
+        )
+        item_cache.put_many(fetched)
+        docs.extend(fetched)
+
+    return docs
+
 
+# Fields CF training needs (numeric_id to read vectors back from FAISS,
+# title / desc to embed items missing from it)
+_CF_ITEM_PROJECTION = {"_id": 1, "numeric_id": 1, "title": 1, "desc": 1}
 
-def get_items_by_topic(topic: str) -> List[Dict[str, Any]]:
-    return list(_items_col().find({"topic": topic}))
+
+def get_cf_items(topic: str) -> List[Dict[str, Any]]:
+    """
+    Items of a topic in a stable order (_id ascending), limited to the
+    fields CF training uses.
+    """
+    return list(
+        _items_col()
+        .find({"topic": topic}, _CF_ITEM_PROJECTION)
+        .sort("_id", ASCENDING)
+    )
 
 
 def insert_item(item: Dict[str, Any]) -> str:
     item.setdefault("created_at", datetime.utcnow())
     result = _items_col().insert_one(item)
+    item_cache.invalidate(item_ids=[result.inserted_id])
     return str(result.inserted_id)
 
 
-def get_item_by_numeric_id(num_id: int):
-    for doc in _items_col().find(
-        {},
-        {
-            "_id": 1,
-            "source": 1,
-            "title": 1,
-            "url": 1,
-            "desc": 1,
-            "topic": 1,
-            "popularity": 1,
-        },
-    ):
-        doc_num_id = int(str(doc["_id"])[-8:], 16) % (10**8)
-        if doc_num_id == num_id:
-            return doc
-    return None
+def get_index_state(topic: str, source: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Indexing state of a (topic, source): ext_id -> {_id, numeric_id, content_hash}.
+    """
+    return {
+        doc["ext_id"]: doc
+        for doc in _items_col().find(
+            {"topic": topic, "source": source},
+            {"_id": 1, "ext_id": 1, "numeric_id": 1, "content_hash": 1},
+        )
+    }
+
+
+def upsert_items(items: List[Dict[str, Any]], chunk_size: int = 1000) -> List[int]:
+    """
+    Bulk upsert keyed by (topic, source, ext_id), chunk_size docs per round trip.
+
+    `_id` is only written when the doc is created; all other fields
+    (including numeric_id) are overwritten.
+
+    Returns:
+        positions (in `items`) of docs that failed to write,
+        e.g. because their numeric_id already exists.
+    """
+    col = _items_col()
+    now = datetime.utcnow()
+    failed: List[int] = []
+
+    for start in range(0, len(items), chunk_size):
+        chunk = items[start:start + chunk_size]
+        ops = []
+        for item in chunk:
+            fields = {k: v for k, v in item.items() if k != "_id"}
+            fields["updated_at"] = now
+            ops.append(
+                UpdateOne(
+                    {"topic": item["topic"], "source": item["source"], "ext_id": item["ext_id"]},
+                    {
+                        "$set": fields,
+                        "$setOnInsert": {"_id": item["_id"], "created_at": now},
+                    },
+                    upsert=True,
+                )
+            )
+        try:
+            col.bulk_write(ops, ordered=False)
+        except BulkWriteError as e:
+            failed.extend(start + err["index"] for err in e.details.get("writeErrors", []))
+
+    item_cache.invalidate(
+        item_ids=[it["_id"] for it in items],
+        numeric_ids=[it["numeric_id"] for it in items],
+    )
+    return failed
+
+
+def set_content_hashes(hashes: Dict[Any, str], chunk_size: int = 1000) -> None:
+    """
+    Mark items (by ObjectId) as embedded for the given content hash.
+    Written only after their vectors are saved, so an interrupted build
+    re-embeds them instead of silently skipping them.
+    """
+    col = _items_col()
+    ops = [
+        UpdateOne({"_id": oid}, {"$set": {"content_hash": h}})
+        for oid, h in hashes.items()
+    ]
+    for start in range(0, len(ops), chunk_size):
+        col.bulk_write(ops[start:start + chunk_size], ordered=False)
+
+
+def find_duplicate_items() -> List[Dict[str, Any]]:
+    """
+    (topic, source, ext_id) keys stored more than once, oldest _id first.
+    """
+    return list(
+        _items_col().aggregate([
+            {"$sort": {"_id": 1}},
+            {"$group": {
+                "_id": {"topic": "$topic", "source": "$source", "ext_id": "$ext_id"},
+                "count": {"$sum": 1},
+                "items": {"$push": {"_id": "$_id", "numeric_id": "$numeric_id"}},
+            }},
+            {"$match": {"count": {"$gt": 1}}},
+        ], allowDiskUse=True)
+    )
+
+
+_STATE_FIELDS = ("liked", "saved", "rating")
+
+
+def repoint_interactions(mapping: Dict[ObjectId, ObjectId]) -> int:
+    """
+    Move interactions from duplicate items (keys) onto the kept item (values).
+
+    Event log docs are re-pointed as is. State docs (liked / saved / rating,
+    one per (user_id, item_id)) are merged into the kept item's state doc
+    when the user has one, the more recently updated value winning per field.
+
+    Returns:
+        number of interaction docs moved or merged.
+    """
+    col = _interactions_col()
+    moved = 0
+
+    for dup, kept in mapping.items():
+        res = col.update_many(
+            {"item_id": dup, "event": {"$exists": True}},
+            {"$set": {"item_id": kept}},
+        )
+        moved += res.modified_count
+
+        for doc in col.find({"item_id": dup, "event": {"$exists": False}}):
+            existing = col.find_one({
+                "user_id": doc["user_id"],
+                "item_id": kept,
+                "event": {"$exists": False},
+            })
+            if existing is None:
+                col.update_one({"_id": doc["_id"]}, {"$set": {"item_id": kept}})
+            else:
+                doc_ts = doc.get("updated_at") or datetime.min
+                kept_ts = existing.get("updated_at") or datetime.min
+                merged = {
+                    f: doc[f] for f in _STATE_FIELDS
+                    if f in doc and (f not in existing or doc_ts > kept_ts)
+                }
+                if merged:
+                    merged["updated_at"] = max(doc_ts, kept_ts)
+                    col.update_one({"_id": existing["_id"]}, {"$set": merged})
+                col.delete_one({"_id": doc["_id"]})
+            moved += 1
+
+    return moved
+
+
+def delete_items(item_ids: List[Any]) -> int:
+    oids = [ObjectId(str(i)) for i in item_ids]
+    result = _items_col().delete_many({"_id": {"$in": oids}})
+    item_cache.invalidate(item_ids=[str(i) for i in oids])
+    return result.deleted_count
+
+
+# Sequence-allocated ids start above the legacy ObjectId-derived range
+# (< 10**8), so the two can coexist until migrate_numeric_ids.py has run.
+NUMERIC_ID_BASE = 10**8
+
+
+def allocate_numeric_ids(n: int) -> List[int]:
+    """
+    Reserve `n` ids from a monotonic int64 sequence in one round trip.
+    Unique across processes and topics.
+    """
+    if n <= 0:
+        return []
+    doc = _counters_col().find_one_and_update(
+        {"_id": "item_numeric_id"},
+        {"$inc": {"seq": n}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    end = NUMERIC_ID_BASE + int(doc["seq"])
+    return list(range(end - n + 1, end + 1))
+
+
+def legacy_numeric_id(item_id) -> int:
+    """
+    FAISS id derived from the last 8 hex digits of the ObjectId.
+    Only used for items indexed before allocate_numeric_ids existed.
+    """
+    return int(str(item_id)[-8:], 16) % (10**8)
+
+
+def get_topic_numeric_ids(topic: str) -> List[Dict[str, Any]]:
+    return list(
+        _items_col().find(
+            {"topic": topic},
+            {"_id": 1, "numeric_id": 1, "legacy_numeric_id": 1},
+        )
+    )
+
+
+def rewrite_numeric_ids(updates: List[Dict[str, Any]], chunk_size: int = 1000) -> None:
+    """
+    Bulk-apply id migrations: each update is
+    {"_id", "numeric_id", "legacy_numeric_id", "reembed": bool}.
+    Items flagged `reembed` have no vector under the new id, so their
+    content_hash is cleared and the next build_index embeds them again.
+    """
+    col = _items_col()
+    ops = []
+    for u in updates:
+        fields = {
+            "numeric_id": u["numeric_id"],
+            "legacy_numeric_id": u["legacy_numeric_id"],
+        }
+        if u.get("reembed"):
+            fields["content_hash"] = None
+        ops.append(UpdateOne({"_id": u["_id"]}, {"$set": fields}))
+
+    for start in range(0, len(ops), chunk_size):
+        col.bulk_write(ops[start:start + chunk_size], ordered=False)
+
+    item_cache.clear()
 
 
 def get_items_by_numeric_ids(num_ids: List[int]) -> List[Dict[str, Any]]:
-    num_set = {int(n) for n in num_ids}
-    results: List[Dict[str, Any]] = []
+    """
+    Resolve FAISS ids to item docs in at most one indexed round trip,
+    served from the item cache where possible.
+    Order of the returned docs is not guaranteed.
+    """
+    found, missing = item_cache.get_many_numeric({int(n) for n in num_ids})
+    docs = list(found.values())
+
+    if missing:
+        fetched = list(
+            _items_col().find({"numeric_id": {"$in": missing}}, _ITEM_PROJECTION)
+        )
+        item_cache.put_many(fetched)
+        docs.extend(fetched)
+
+    return docs
+
+
+def backfill_numeric_ids(batch_size: int = 1000) -> int:
+    """
+    Write numeric_id on items created before it was stored.
+    Uses the legacy ObjectId-derived id so existing FAISS indexes still match.
+
+    Returns:
+        number of documents updated.
+    """
+    col = _items_col()
+    ops: List[UpdateOne] = []
+    updated = 0
+
+    for doc in col.find({"numeric_id": {"$exists": False}}, {"_id": 1}):
+        ops.append(
+            UpdateOne(
+                {"_id": doc["_id"]},
+                {"$set": {"numeric_id": legacy_numeric_id(doc["_id"])}},
+            )
+        )
+        if len(ops) >= batch_size:
+            updated += _bulk_update(col, ops)
+            ops = []
 
-    for doc in _items_col().find(
-        {},
-        {
-            "_id": 1,
-            "source": 1,
-            "title": 1,
-            "url": 1,
-            "desc": 1,
-            "topic": 1,
-            "popularity": 1,
-        },
-    ):
-        doc_num_id = int(str(doc["_id"])[-8:], 16) % (10**8)
-        if doc_num_id in num_set:
-            doc["numeric_id"] = doc_num_id
-            results.append(doc)
-
-    return results
-
-def set_item_numeric_id(item_id: str, numeric_id: int):
-    _items_col().update_one(
-        {"_id": ObjectId(item_id)},
-        {"$set": {"numeric_id": numeric_id}},
+    if ops:
+        updated += _bulk_update(col, ops)
+
+    return updated
+
+
+def _bulk_update(col, ops: List[UpdateOne]) -> int:
+    try:
+        return col.bulk_write(ops, ordered=False).modified_count
+    except BulkWriteError as e:
+        # Duplicate numeric ids are skipped; the rest of the batch still applies.
+        print("bulk update errors:", len(e.details.get("writeErrors", [])))
+        return e.details.get("nModified", 0)
+
+
+def find_duplicate_numeric_ids() -> List[Dict[str, Any]]:
+    """
+    numeric_id values shared by more than one item (blocks the unique index).
+    """
+    return list(
+        _items_col().aggregate([
+            {"$match": {"numeric_id": {"$exists": True}}},
+            {"$group": {
+                "_id": "$numeric_id",
+                "count": {"$sum": 1},
+                "item_ids": {"$push": "$_id"},
+            }},
+            {"$match": {"count": {"$gt": 1}}},
+        ])
     )
 
 
@@ -177,11 +502,124 @@ def log_interaction(
     })
 
 
-def get_interactions_by_topic(topic: str):
-    ids = [
-        it["_id"]
-        for it in _items_col().find({"topic": topic}, {"_id": 1})
+# Interaction weight, computed server-side:
+# liked +2, saved +2.5, + numeric rating; 1 when none of these apply.
+_INTERACTION_WEIGHT = {
+    "$let": {
+        "vars": {
+            "w": {
+                "$add": [
+                    {"$cond": [{"$eq": ["$i.liked", True]}, 2.0, 0.0]},
+                    {"$cond": [{"$eq": ["$i.saved", True]}, 2.5, 0.0]},
+                    {
+                        "$cond": [
+                            {"$in": [{"$type": "$i.rating"}, ["double", "int", "long", "decimal"]]},
+                            "$i.rating",
+                            0.0,
+                        ]
+                    },
+                ]
+            }
+        },
+        "in": {"$cond": [{"$eq": ["$$w", 0]}, 1.0, "$$w"]},
+    }
+}
+
+
+def _interaction_filter(since: Optional[datetime]) -> Dict[str, Any]:
+    match: Dict[str, Any] = {"i.user_id": {"$ne": None}}
+    if since is not None:
+        match["$or"] = [{"i.updated_at": {"$gt": since}}, {"i.ts": {"$gt": since}}]
+    return match
+
+
+def get_interaction_arrays(topic: str, since: Optional[datetime] = None):
+    """
+    Weighted (user, item) interactions of a topic, aggregated in Mongo.
+    With `since`, only interactions updated (or logged) after it.
+
+    Returns:
+        (users, user_codes, item_ids, weights): users sorted ascending;
+        user_codes index into users; item_ids are ObjectId strings; the
+        last three are parallel lists, one entry per (user, item) pair.
+    """
+    pipeline = [
+        {"$match": {"topic": topic}},
+        {"$project": {"_id": 1}},
+        {
+            "$lookup": {
+                "from": "interactions",
+                "localField": "_id",
+                "foreignField": "item_id",
+                "as": "i",
+            }
+        },
+        {"$unwind": "$i"},
+        {"$match": _interaction_filter(since)},
+        {"$project": {"_id": 0, "u": "$i.user_id", "item": "$_id", "w": _INTERACTION_WEIGHT}},
+        {"$group": {"_id": {"u": "$u", "item": "$item"}, "w": {"$sum": "$w"}}},
+        {
+            "$group": {
+                "_id": "$_id.u",
+                "items": {"$push": {"$toString": "$_id.item"}},
+                "w": {"$push": "$w"},
+            }
+        },
+        {"$sort": {"_id": 1}},
     ]
-    return list(
-        _interactions_col().find({"item_id": {"$in": ids}})
-    )
\ No newline at end of file
+
+    users: List[str] = []
+    user_codes: List[int] = []
+    item_ids: List[str] = []
+    weights: List[float] = []
+
+    cursor = _items_col().aggregate(pipeline, allowDiskUse=True)
+    for code, doc in enumerate(cursor):
+        users.append(doc["_id"])
+        user_codes.extend([code] * len(doc["items"]))
+        item_ids.extend(doc["items"])
+        weights.extend(doc["w"])
+
+    return users, user_codes, item_ids, weights
+
+
+def get_topics() -> List[str]:
+    return [t for t in _items_col().distinct("topic") if t]
+
+
+def get_interaction_watermark(topic: str, since: Optional[datetime] = None) -> Dict[str, Any]:
+    """
+    Interaction signal of a topic, for deciding whether CF needs retraining.
+
+    Returns:
+        {"count": interactions, "new": interactions updated after `since`,
+         "last_ts": latest updated_at / ts, or None}
+    """
+    since = since or datetime(1970, 1, 1)
+    pipeline = [
+        {"$match": {"topic": topic}},
+        {"$project": {"_id": 1}},
+        {
+            "$lookup": {
+                "from": "interactions",
+                "localField": "_id",
+                "foreignField": "item_id",
+                "as": "i",
+            }
+        },
+        {"$unwind": "$i"},
+        {"$project": {"ts": {"$ifNull": ["$i.updated_at", "$i.ts"]}}},
+        {
+            "$group": {
+                "_id": None,
+                "count": {"$sum": 1},
+                "new": {"$sum": {"$cond": [{"$gt": ["$ts", since]}, 1, 0]}},
+                "last_ts": {"$max": "$ts"},
+            }
+        },
+    ]
+    docs = list(_items_col().aggregate(pipeline, allowDiskUse=True))
+    if not docs:
+        return {"count": 0, "new": 0, "last_ts": None}
+    doc = docs[0]
+    return {"count": doc["count"], "new": doc["new"], "last_ts": doc["last_ts"]}
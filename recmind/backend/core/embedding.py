@@ -1,8 +1,12 @@
 # backend/core/embedding.py
 import os
+import threading
 import numpy as np
+from pathlib import Path
 from typing import List
-from sentence_transformers import SentenceTransformer
+
+from backend.config import get_settings
+from backend.core.paths import MODEL_DIR
 
 # You can pick any free Hugging Face model here
 # Some good options:
@@ -13,10 +17,118 @@ from sentence_transformers import SentenceTransformer
 
 MODEL_NAME = os.getenv("HF_EMBEDDING_MODEL", "all-MiniLM-L6-v2")
 
-# Load model once at startup
-model = SentenceTransformer(MODEL_NAME)
+settings = get_settings()
+
+# Loaded on first use (or by warmup() on app startup) so that importing
+# this module does not pull in torch.
+_model = None
+_model_lock = threading.Lock()
+
+# Intra-op threads of the model (0: library default); pool workers lower it
+_threads = settings.EMBEDDING_THREADS
+
+
+def onnx_model_dir() -> Path:
+    return MODEL_DIR / "onnx" / MODEL_NAME.replace("/", "_")
+
+
+def backend_name() -> str:
+    """Identifies the exact vector producer (model + backend)."""
+    if settings.EMBEDDING_BACKEND == "onnx":
+        return f"{MODEL_NAME}:onnx{'-int8' if settings.EMBEDDING_QUANTIZED else ''}"
+    return f"{MODEL_NAME}:torch"
+
+
+def set_threads(threads: int):
+    """
+    Intra-op thread budget of the model, applied when it loads (or to
+    torch directly if it is already loaded).
+    """
+    global _threads
+    _threads = threads
+    if _model is not None and settings.EMBEDDING_BACKEND == "torch":
+        import torch
+        torch.set_num_threads(threads)
+
+
+def _load_model():
+    threads = _threads
+    if settings.EMBEDDING_BACKEND == "onnx":
+        from backend.core.onnx_embedding import OnnxEncoder
+        return OnnxEncoder(
+            onnx_model_dir(), quantized=settings.EMBEDDING_QUANTIZED, threads=threads
+        )
+
+    if threads:
+        import torch
+        torch.set_num_threads(threads)
+
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(MODEL_NAME)
+
+
+def get_model():
+    """
+    SentenceTransformer (EMBEDDING_BACKEND=torch) or OnnxEncoder
+    (EMBEDDING_BACKEND=onnx); both return normalized float32 vectors.
+    """
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                _model = _load_model()
+    return _model
+
+
+def warmup():
+    """Load the model and run one encode so the first request is not slow."""
+    get_model()
+    # Uncached: a cache hit would skip the forward pass being warmed up
+    embed_texts(["warmup"], cache=False)
+
+
+def embedding_cache_dir() -> Path:
+    return settings.EMBEDDING_CACHE_DIR or (MODEL_DIR / "embeddings")
+
+
+def embed_texts(texts: List[str], workers: int = 1, cache: bool = True) -> np.ndarray:
+    """
+    Embed a list of texts with the configured backend (torch or ONNX).
+
+    - With cache (and settings.EMBEDDING_CACHE), vectors already in the
+      on-disk embedding store are reused and only new texts are encoded.
+    - With workers > 1, large inputs are sharded across a process pool.
+    """
+    if cache and settings.EMBEDDING_CACHE and texts:
+        return _embed_cached(texts, workers)
+    return _embed(texts, workers)
+
+
+def _embed_cached(texts: List[str], workers: int) -> np.ndarray:
+    from backend.core.embedding_store import get_embedding_store
+
+    store = get_embedding_store(embedding_cache_dir(), backend_name())
+    keys = [store.key(t) for t in texts]
+    found = store.get_many(keys)
+
+    missing = {}
+    for k, t in zip(keys, texts):
+        if k not in found:
+            missing.setdefault(k, t)
+
+    if missing:
+        new_keys = list(missing)
+        vecs = _embed([missing[k] for k in new_keys], workers)
+        store.put_many(new_keys, vecs)
+        found.update(zip(new_keys, vecs))
+
+    return np.stack([found[k] for k in keys]).astype("float32")
+
+
+def _embed(texts: List[str], workers: int) -> np.ndarray:
+    if workers > 1 and len(texts) >= settings.EMBEDDING_PARALLEL_MIN_TEXTS:
+        from backend.core.parallel_embedding import encode_parallel
+        return encode_parallel(texts, workers, shard_size=settings.EMBEDDING_SHARD_SIZE)
 
-def embed_texts(texts: List[str]) -> np.ndarray:
-    """Embed a list of texts using a Hugging Face SentenceTransformer model."""
-    embeddings = model.encode(texts, convert_to_numpy=True, normalize_embeddings=True)
+    embeddings = get_model().encode(texts, convert_to_numpy=True, normalize_embeddings=True)
     return embeddings.astype("float32")
@@ -0,0 +1,166 @@
+# backend/core/embedding_store.py
+"""
+Content-addressed, persistent embedding cache.
+
+Vectors live in one append-only float32 file (memory-mapped for reads);
+a SQLite table maps a 16-byte key, sha1(model key + normalized text), to
+the vector's row. Several processes can share a store: row allocation and
+key inserts happen in one IMMEDIATE transaction.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import unicodedata
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+_SQLITE_MAX_VARS = 900
+
+
+def normalize_text(text: str) -> str:
+    # Whitespace runs do not change tokenization, so they share a key
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+class EmbeddingStore:
+    def __init__(self, root: Path, model_key: str):
+        self.model_key = model_key
+        self.dir = Path(root) / model_key.replace("/", "_").replace(":", "__")
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.vec_path = self.dir / "vectors.f32"
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            str(self.dir / "index.sqlite"),
+            timeout=60,
+            isolation_level=None,  # explicit transactions
+            check_same_thread=False,
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS keys (k BLOB PRIMARY KEY, row INTEGER NOT NULL) WITHOUT ROWID"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)"
+        )
+
+        self.dim: Optional[int] = self._meta("dim")
+        self._mm: Optional[np.memmap] = None
+        self._mm_rows = 0
+
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, text: str) -> bytes:
+        h = hashlib.sha1(self.model_key.encode("utf-8"))
+        h.update(b"\0")
+        h.update(normalize_text(text).encode("utf-8"))
+        return h.digest()[:16]
+
+    def _meta(self, name: str) -> Optional[int]:
+        row = self._conn.execute("SELECT value FROM meta WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def _map(self, need_rows: int) -> np.memmap:
+        if self._mm is None or need_rows > self._mm_rows:
+            n = os.path.getsize(self.vec_path) // (self.dim * 4)
+            self._mm = np.memmap(self.vec_path, dtype="float32", mode="r", shape=(n, self.dim))
+            self._mm_rows = n
+        return self._mm
+
+    # -------------------------
+    # Read / write
+    # -------------------------
+
+    def get_many(self, keys: List[bytes]) -> Dict[bytes, np.ndarray]:
+        rows: Dict[bytes, int] = {}
+        with self._lock:
+            uniq = list(set(keys))
+            for start in range(0, len(uniq), _SQLITE_MAX_VARS):
+                part = uniq[start:start + _SQLITE_MAX_VARS]
+                marks = ",".join("?" * len(part))
+                rows.update(
+                    self._conn.execute(
+                        f"SELECT k, row FROM keys WHERE k IN ({marks})", part
+                    ).fetchall()
+                )
+
+            self.hits += len(rows)
+            self.misses += len(uniq) - len(rows)
+            if not rows:
+                return {}
+
+            mm = self._map(max(rows.values()) + 1)
+            return {k: np.array(mm[r]) for k, r in rows.items()}
+
+    def put_many(self, keys: List[bytes], vecs: np.ndarray) -> None:
+        vecs = np.ascontiguousarray(vecs, dtype="float32")
+        if len(keys) == 0:
+            return
+
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                dim = self._meta("dim")
+                if dim is None:
+                    dim = vecs.shape[1]
+                    self._conn.execute("INSERT INTO meta VALUES ('dim', ?)", (dim,))
+                elif dim != vecs.shape[1]:
+                    raise ValueError(
+                        f"Embedding store {self.dir} holds dim {dim}, got {vecs.shape[1]}"
+                    )
+                self.dim = dim
+
+                start = self._meta("rows") or 0
+                fd = os.open(self.vec_path, os.O_RDWR | os.O_CREAT, 0o644)
+                try:
+                    os.pwrite(fd, vecs.tobytes(), start * dim * 4)
+                finally:
+                    os.close(fd)
+
+                # A key another process stored meanwhile keeps its first row
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO keys VALUES (?, ?)",
+                    [(k, start + i) for i, k in enumerate(keys)],
+                )
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO meta VALUES ('rows', ?)", (start + len(keys),)
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "model_key": self.model_key,
+                "rows": self._meta("rows") or 0,
+                "dim": self.dim,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+_store: Optional[EmbeddingStore] = None
+_store_lock = threading.Lock()
+
+
+def get_embedding_store(root: Path, model_key: str) -> EmbeddingStore:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = EmbeddingStore(root, model_key)
+    return _store
+
+
+def embedding_store_stats() -> Optional[Dict[str, Any]]:
+    return _store.stats() if _store is not None else None
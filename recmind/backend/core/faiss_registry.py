@@ -0,0 +1,162 @@
+# backend/core/faiss_registry.py
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Tuple
+
+from backend.config import get_settings
+from backend.core.faiss_store import FaissStore, _normalize_topic
+from backend.core.paths import FAISS_DIR
+
+
+class _Entry:
+    __slots__ = ("store", "version", "nbytes", "checked_at")
+
+    def __init__(self, store: FaissStore, version: Tuple[int, int], nbytes: int):
+        self.store = store
+        self.version = version
+        self.nbytes = nbytes
+        self.checked_at = time.monotonic()
+
+
+class FaissRegistry:
+    """
+    Process-wide cache of loaded FaissStore objects.
+
+    - Keyed by index path (one path per normalized topic).
+    - Reloads an index when its file (mtime_ns, size) changes; the new store
+      is swapped in atomically, in-flight requests keep the old object.
+    - Evicts least recently used indexes once `max_bytes` is exceeded.
+    """
+
+    def __init__(self, max_bytes: int, check_interval: float = 1.0):
+        self.max_bytes = max_bytes
+        self.check_interval = check_interval
+
+        self._lock = threading.Lock()
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+
+        self.hits = 0
+        self.loads = 0
+        self.reloads = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _version(path: Path) -> Tuple[int, int]:
+        st = os.stat(path)
+        return st.st_mtime_ns, st.st_size
+
+    def _load_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            return self._load_locks.setdefault(key, threading.Lock())
+
+    # -------------------------
+    # Lookups
+    # -------------------------
+
+    def get(self, topic: str) -> FaissStore:
+        """
+        Loaded store for a topic.
+        Raises FileNotFoundError if the topic has no index on disk.
+        """
+        path = FAISS_DIR / f"{_normalize_topic(topic)}.index"
+        return self.get_path(path)
+
+    def get_path(self, path) -> FaissStore:
+        path = Path(path)
+        key = str(path.resolve())
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                if time.monotonic() - entry.checked_at < self.check_interval:
+                    self.hits += 1
+                    return entry.store
+
+        try:
+            version = self._version(path)
+        except FileNotFoundError:
+            self.invalidate(path)
+            raise FileNotFoundError(f"FAISS index not found at {path}")
+
+        if entry is not None and entry.version == version:
+            entry.checked_at = time.monotonic()
+            with self._lock:
+                self.hits += 1
+            return entry.store
+
+        # Load outside the registry lock so other topics keep serving;
+        # the per-path lock stops concurrent requests loading the same file.
+        with self._load_lock(key):
+            with self._lock:
+                current = self._entries.get(key)
+            if current is not None and current.version == version:
+                return current.store
+
+            store = FaissStore.from_path(path)
+            new_entry = _Entry(store, version, store.nbytes())
+
+            with self._lock:
+                if key in self._entries:
+                    self.reloads += 1
+                else:
+                    self.loads += 1
+                self._entries[key] = new_entry
+                self._entries.move_to_end(key)
+                self._evict()
+
+        return store
+
+    # -------------------------
+    # Eviction / invalidation
+    # -------------------------
+
+    def _evict(self) -> None:
+        total = sum(e.nbytes for e in self._entries.values())
+        # Always keep the most recently used index, even if it alone is too big
+        while total > self.max_bytes and len(self._entries) > 1:
+            _, entry = self._entries.popitem(last=False)
+            total -= entry.nbytes
+            self.evictions += 1
+
+    def invalidate(self, path) -> None:
+        key = str(Path(path).resolve())
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "loaded": len(self._entries),
+                "bytes": sum(e.nbytes for e in self._entries.values()),
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "loads": self.loads,
+                "reloads": self.reloads,
+                "evictions": self.evictions,
+                "indexes": {
+                    Path(k).name: {
+                        "kind": e.store.kind,
+                        "ntotal": e.store.index.ntotal,
+                        "bytes": e.nbytes,
+                    }
+                    for k, e in self._entries.items()
+                },
+            }
+
+
+_settings = get_settings()
+
+faiss_registry = FaissRegistry(
+    max_bytes=_settings.FAISS_CACHE_MAX_BYTES,
+    check_interval=_settings.FAISS_RELOAD_CHECK_SECONDS,
+)
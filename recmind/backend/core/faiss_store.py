@@ -1,10 +1,48 @@
 # backend/core/faiss_store.py
 
+import json
+import math
+import os
+import time
 import faiss
 import numpy as np
 from pathlib import Path
+from backend.config import get_settings
 from backend.core.paths import FAISS_DIR
 
+settings = get_settings()
+
+# Supported index layouts. Vectors are keyed by Mongo numeric ids: IVF indexes
+# store them natively, flat / HNSW are wrapped in an IndexIDMap2.
+INDEX_KINDS = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+
+# Distance metrics. Embeddings are L2-normalized, so inner product is the
+# cosine similarity; "l2" (squared distance) is the legacy layout.
+METRICS = ("ip", "l2")
+
+
+def _faiss_metric(metric: str) -> int:
+    if metric == "ip":
+        return faiss.METRIC_INNER_PRODUCT
+    if metric == "l2":
+        return faiss.METRIC_L2
+    raise ValueError(f"Unknown FAISS metric '{metric}', expected one of {METRICS}")
+
+
+def index_metric(index: faiss.Index) -> str:
+    return "ip" if index.metric_type == faiss.METRIC_INNER_PRODUCT else "l2"
+
+
+def to_cosine(distances: np.ndarray, metric: str) -> np.ndarray:
+    """
+    Cosine similarity of normalized vectors from FAISS distances:
+    inner product is the cosine itself; squared L2 is 2 - 2 cos.
+    """
+    distances = np.asarray(distances, dtype="float32")
+    if metric == "ip":
+        return distances
+    return 1.0 - distances / 2.0
+
 
 def _normalize_topic(topic: str) -> str:
     return (
@@ -15,16 +53,216 @@ def _normalize_topic(topic: str) -> str:
     )
 
 
+def _io_flags(mmap: bool) -> int:
+    """
+    faiss.read_index flags. With mmap, index data is mapped read-only so
+    pages come from the shared OS page cache instead of a private heap copy.
+    """
+    if not mmap:
+        return 0
+    flags = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY
+    # faiss >= 1.10 can also map IndexFlatCodes storage (flat / PQ codes);
+    # older builds only map on-disk IVF inverted lists.
+    flags |= getattr(faiss, "IO_FLAG_MMAP_IFC", 0)
+    return flags
+
+
+def _ivfdata_path(path: Path) -> Path:
+    # Versioned per save: readers keep mapping the lists of the index file
+    # they opened while the next save writes a new file.
+    return path.with_name(f"{path.stem}.{time.time_ns()}.ivfdata")
+
+
+def _ivfdata_files(path: Path) -> list[Path]:
+    """
+    Inverted-list files of an index, oldest first (including the
+    unversioned <topic>.ivfdata of older conversions).
+    """
+    # Topic names may contain dots ("node" vs "node.js"): only a numeric
+    # version may sit between the stem and the suffix.
+    prefix, suffix = f"{path.stem}.", ".ivfdata"
+    files = [
+        f for f in path.parent.glob(f"*{suffix}")
+        if f.name == f"{path.stem}{suffix}"
+        or (f.name.startswith(prefix) and f.name[len(prefix):-len(suffix)].isdigit())
+    ]
+    return sorted(files, key=lambda f: f.stat().st_mtime)
+
+
+def _ondisk_invlists(index: faiss.Index) -> bool:
+    ivf = faiss.try_extract_index_ivf(index)
+    return ivf is not None and isinstance(
+        faiss.downcast_InvertedLists(ivf.invlists), faiss.OnDiskInvertedLists
+    )
+
+
+def _is_mapped(index: faiss.Index) -> bool:
+    """
+    Whether reading with _io_flags(True) maps the index data rather than
+    copying it to the heap.
+    """
+    if faiss.try_extract_index_ivf(index) is not None:
+        return _ondisk_invlists(index)
+    return hasattr(faiss, "IO_FLAG_MMAP_IFC")
+
+
+def _invlists_to_memory(index: faiss.Index):
+    """
+    Copy on-disk inverted lists into in-memory lists, so writes never touch
+    the .ivfdata file that serving processes have mapped.
+    """
+    ivf = faiss.extract_index_ivf(index)
+    ondisk = ivf.invlists
+    mem = faiss.ArrayInvertedLists(ivf.nlist, ivf.code_size)
+    for l in range(ivf.nlist):
+        n = ondisk.list_size(l)
+        if n:
+            mem.add_entries(l, n, ondisk.get_ids(l), ondisk.get_codes(l))
+    ivf.replace_invlists(mem, True)
+    mem.this.disown()
+
+
+def _write_ondisk(index: faiss.Index, index_path: Path, ivfdata: Path):
+    """
+    Write an IVF index with its inverted lists in a new OnDiskInvertedLists
+    file; the in-memory lists of `index` are left in place.
+    """
+    ivf = faiss.extract_index_ivf(index)
+    ondisk = faiss.OnDiskInvertedLists(ivf.nlist, ivf.code_size, str(ivfdata))
+    src = faiss.InvertedListsPtrVector()
+    src.push_back(ivf.invlists)
+    merge = getattr(ondisk, "merge_from_multiple", None) or ondisk.merge_from
+    merge(src.data(), src.size(), False)
+
+    mem, own = ivf.invlists, ivf.own_invlists
+    ivf.own_invlists = False
+    ivf.replace_invlists(ondisk, False)
+    try:
+        faiss.write_index(index, str(index_path))
+    finally:
+        ivf.replace_invlists(mem, own)
+
+
+def _meta_path(path: Path) -> Path:
+    return path.with_suffix(".meta.json")
+
+
+def _default_nlist(n: int) -> int:
+    # ~4*sqrt(n) lists, but keep >= 39 training points per centroid
+    return max(1, min(int(4 * math.sqrt(max(n, 1))), n // 39 or 1))
+
+
+def _pq_m(dim: int, m: int) -> int:
+    # PQ sub-quantizers must divide the vector dimension
+    m = max(1, min(m, dim))
+    while dim % m:
+        m -= 1
+    return m
+
+
+def make_index(
+    kind: str,
+    dim: int,
+    n_train: int = 0,
+    metric: str | None = None,
+    **params,
+) -> faiss.Index:
+    """
+    Build an empty (untrained) index of the given kind.
+
+    metric: "ip" or "l2" (default settings.FAISS_METRIC).
+
+    Params:
+        nlist: IVF lists (default derived from n_train)
+        pq_m:  IVF-PQ sub-quantizers (settings.FAISS_PQ_M)
+        hnsw_m: HNSW graph degree (settings.FAISS_HNSW_M)
+    """
+    metric = metric or settings.FAISS_METRIC
+    faiss_metric = _faiss_metric(metric)
+
+    if kind in ("ivf_flat", "ivf_pq"):
+        nlist = params.get("nlist") or _default_nlist(n_train)
+        quantizer = faiss.IndexFlatIP(dim) if metric == "ip" else faiss.IndexFlatL2(dim)
+        if kind == "ivf_flat":
+            return faiss.IndexIVFFlat(quantizer, dim, nlist, faiss_metric)
+        m = _pq_m(dim, params.get("pq_m") or settings.FAISS_PQ_M)
+        nbits = 8 if n_train >= 256 * 39 else 6
+        return faiss.IndexIVFPQ(quantizer, dim, nlist, m, nbits, faiss_metric)
+
+    if kind == "flat":
+        base = faiss.IndexFlatIP(dim) if metric == "ip" else faiss.IndexFlatL2(dim)
+    elif kind == "hnsw":
+        base = faiss.IndexHNSWFlat(
+            dim, params.get("hnsw_m") or settings.FAISS_HNSW_M, faiss_metric
+        )
+    else:
+        raise ValueError(f"Unknown FAISS index kind '{kind}', expected one of {INDEX_KINDS}")
+
+    # IDMap2 keeps an id -> slot map so vectors can be reconstructed by id
+    return faiss.IndexIDMap2(base)
+
+
+def index_kind(index: faiss.Index) -> str:
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        return "ivf_pq" if isinstance(faiss.downcast_index(ivf), faiss.IndexIVFPQ) else "ivf_flat"
+
+    base = index
+    if isinstance(index, (faiss.IndexIDMap, faiss.IndexIDMap2)):
+        base = faiss.downcast_index(index.index)
+    if isinstance(base, faiss.IndexHNSW):
+        return "hnsw"
+    return "flat"
+
+
+def convert_to_mmap_layout(path) -> str:
+    """
+    Rewrite an existing index file so it can be memory-mapped.
+
+    - IVF indexes: inverted lists move to an OnDiskInvertedLists file
+      (<topic>.<version>.ivfdata) next to the index, which IO_FLAG_MMAP maps
+      directly. Later saves of the index keep this layout.
+    - Flat indexes: the standard layout is already mappable when faiss
+      exposes IO_FLAG_MMAP_IFC; nothing is rewritten.
+
+    Returns:
+        short description of what was done.
+    """
+    path = Path(path)
+    store = FaissStore.from_path(path, mmap=False)
+
+    if store.kind not in ("ivf_flat", "ivf_pq"):
+        if hasattr(faiss, "IO_FLAG_MMAP_IFC"):
+            return "flat: already mmap-ready"
+        return "flat: needs faiss >= 1.10 (IO_FLAG_MMAP_IFC) to map"
+
+    if store.ondisk:
+        return "ivf: already on-disk"
+
+    store.ondisk = True
+    store.save()
+    return f"ivf: inverted lists moved to {_ivfdata_files(path)[-1].name}"
+
+
 class FaissStore:
-    def __init__(self, dim: int, path: Path):
+    def __init__(self, dim: int, path: Path, metric: str | None = None):
         self.dim = dim
         self.path = path
-        self.index = faiss.IndexIDMap(faiss.IndexFlatL2(dim))
+        self.metric = metric or settings.FAISS_METRIC
+        self.index = make_index("flat", dim, metric=self.metric)
+        self.kind = "flat"
+        self.params: dict = {}
+        self.nprobe = settings.FAISS_NPROBE
+        self.ef_search = settings.FAISS_EF_SEARCH
+        self.mmap = False
+        # IVF lists are saved to a separate .ivfdata file (mmap layout)
+        self.ondisk = False
 
     @classmethod
-    def from_topic(cls, topic: str) -> "FaissStore":
+    def from_topic(cls, topic: str, mmap: bool | None = None) -> "FaissStore":
         """
-        Read-only / recommend-time usage
+        Read-only / recommend-time usage.
+        mmap defaults to settings.FAISS_MMAP.
         """
 
         safe_topic = _normalize_topic(topic)
@@ -35,27 +273,323 @@ class FaissStore:
                 f"FAISS index not found for topic '{topic}' at {path}"
             )
 
-        index = faiss.read_index(str(path))
-        dim = index.d
+        return cls.from_path(path, mmap=mmap)
+
+    @classmethod
+    def from_path(cls, path, mmap: bool | None = None) -> "FaissStore":
+        if mmap is None:
+            mmap = settings.FAISS_MMAP
+
+        path = Path(path)
+        index = faiss.read_index(str(path), _io_flags(mmap))
 
-        store = cls(dim=dim, path=path)
-        store.index = index
+        store = cls(dim=index.d, path=path)
+        store.ondisk = _ondisk_invlists(index)
+        if store.ondisk and not mmap:
+            _invlists_to_memory(index)
+        store._set_index(index)
+        store.mmap = mmap
         return store
 
+    # -------------------------
+    # Index layout / metadata
+    # -------------------------
+
+    def _set_index(self, index: faiss.Index):
+        """
+        Install a loaded index and apply per-topic settings from the
+        sidecar metadata file (<topic>.meta.json), if present.
+        """
+        self.index = index
+        self.dim = index.d
+        self.kind = index_kind(index)
+        # The index itself is authoritative; the sidecar records it for tools
+        self.metric = index_metric(index)
+
+        meta_path = _meta_path(Path(self.path))
+        if meta_path.exists():
+            meta = json.loads(meta_path.read_text())
+            self.params = meta.get("params", {})
+            self.nprobe = meta.get("nprobe", self.nprobe)
+            self.ef_search = meta.get("ef_search", self.ef_search)
+
+        self.configure_search(self.nprobe, self.ef_search)
+
+    def configure_search(self, nprobe: int | None = None, ef_search: int | None = None):
+        """
+        Default query-time accuracy/speed knobs for ANN indexes.
+        """
+        if nprobe is not None:
+            self.nprobe = nprobe
+        if ef_search is not None:
+            self.ef_search = ef_search
+
+        if self.kind in ("ivf_flat", "ivf_pq"):
+            faiss.extract_index_ivf(self.index).nprobe = self.nprobe
+        elif self.kind == "hnsw":
+            faiss.downcast_index(self.index.index).hnsw.efSearch = self.ef_search
+
+    def _search_params(self, nprobe: int | None, ef_search: int | None, sel=None):
+        if self.kind in ("ivf_flat", "ivf_pq"):
+            if nprobe is None and sel is None:
+                return None
+            params = faiss.SearchParametersIVF(nprobe=nprobe or self.nprobe)
+        elif self.kind == "hnsw":
+            if ef_search is None and sel is None:
+                return None
+            params = faiss.SearchParametersHNSW(efSearch=ef_search or self.ef_search)
+        elif sel is not None:
+            params = faiss.SearchParameters()
+        else:
+            return None
+        if sel is not None:
+            params.sel = sel
+        return params
+
+    def meta(self) -> dict:
+        return {
+            "kind": self.kind,
+            "metric": self.metric,
+            "params": self.params,
+            "nprobe": self.nprobe,
+            "ef_search": self.ef_search,
+            "ntotal": int(self.index.ntotal),
+            "dim": self.dim,
+        }
+
+    def nbytes(self) -> int:
+        """
+        Approximate private (heap) size; the serialized file is a close proxy.
+        Mapped indexes only hold their id map on the heap.
+        """
+        if self.mmap and _is_mapped(self.index):
+            return self.index.ntotal * 8
+        path = Path(self.path)
+        if path.exists():
+            return path.stat().st_size
+        return self.index.ntotal * (self.dim * 4 + 8)
+
+    # -------------------------
+    # ANN promotion
+    # -------------------------
+
+    def ids(self) -> np.ndarray:
+        """
+        Ids of the vectors currently stored (int64).
+        """
+        if self.index.ntotal == 0:
+            return np.zeros(0, dtype="int64")
+
+        ivf = faiss.try_extract_index_ivf(self.index)
+        if ivf is not None:
+            invlists = ivf.invlists
+            return np.concatenate([
+                faiss.rev_swig_ptr(invlists.get_ids(l), invlists.list_size(l)).copy()
+                for l in range(ivf.nlist)
+                if invlists.list_size(l)
+            ]).astype("int64")
+
+        return faiss.vector_to_array(self.index.id_map).astype("int64")
+
+    def all_vectors(self):
+        """
+        Returns:
+            (vectors float32 (n, dim), ids int64 (n,)) currently stored.
+            PQ indexes return their (lossy) reconstructions.
+        """
+        n = self.index.ntotal
+        if n == 0:
+            return np.zeros((0, self.dim), dtype="float32"), np.zeros(0, dtype="int64")
+
+        ids = self.ids()
+        ivf = faiss.try_extract_index_ivf(self.index)
+        if ivf is not None:
+            ivf.set_direct_map_type(faiss.DirectMap.Hashtable)
+            vecs = ivf.reconstruct_batch(ids)
+            return np.asarray(vecs, dtype="float32"), ids
+
+        vecs = faiss.downcast_index(self.index.index).reconstruct_n(0, n)
+        return np.asarray(vecs, dtype="float32"), ids
+
+    def vectors(self, ids):
+        """
+        Stored vectors for the given ids.
+
+        Returns:
+            (vectors float32 (len(ids), dim), found bool (len(ids),)).
+            Rows of ids not in the index are zero.
+        """
+        ids = np.asarray(ids, dtype="int64")
+        out = np.zeros((len(ids), self.dim), dtype="float32")
+
+        all_vecs, all_ids = self.all_vectors()
+        if len(all_ids) == 0 or len(ids) == 0:
+            return out, np.zeros(len(ids), dtype=bool)
+
+        order = np.argsort(all_ids)
+        pos = np.searchsorted(all_ids, ids, sorter=order)
+        slot = order[np.minimum(pos, len(all_ids) - 1)]
+        found = all_ids[slot] == ids
+        out[found] = all_vecs[slot[found]]
+        return out, found
+
+    def promote(self, kind: str, metric: str | None = None, **params):
+        """
+        Rebuild the index as `kind` (and optionally another metric),
+        training on the vectors already stored.
+        """
+        self._check_writable()
+        vecs, ids = self.all_vectors()
+        metric = metric or self.metric
+
+        index = make_index(kind, self.dim, n_train=len(vecs), metric=metric, **params)
+        if not index.is_trained:
+            train = vecs
+            max_train = settings.FAISS_MAX_TRAIN_POINTS
+            if len(train) > max_train:
+                rng = np.random.default_rng(42)
+                train = train[rng.choice(len(train), max_train, replace=False)]
+            index.train(train)
+        if len(vecs):
+            index.add_with_ids(vecs, ids)
+
+        self.index = index
+        self.kind = kind
+        self.metric = metric
+        self.params = params
+        self.configure_search()
+
+    def maybe_promote(self) -> bool:
+        """
+        Promote a flat index to settings.FAISS_ANN_INDEX once it grows past
+        settings.FAISS_ANN_THRESHOLD vectors.
+        """
+        target = settings.FAISS_ANN_INDEX
+        if self.kind != "flat" or target == "flat":
+            return False
+        if self.index.ntotal < settings.FAISS_ANN_THRESHOLD:
+            return False
+        self.promote(target)
+        return True
+
+    # -------------------------
+    # Read / write
+    # -------------------------
+
+    def _check_writable(self):
+        if self.mmap:
+            raise RuntimeError(
+                f"FAISS index {self.path} is memory-mapped read-only"
+            )
+
     def upsert(self, vecs, ids):
+        self._check_writable()
         vecs = np.asarray(vecs, dtype="float32")
         ids = np.asarray(ids, dtype="int64")
         self.index.add_with_ids(vecs, ids)
 
-    def search(self, query_vec, k: int):
-        query_vec = np.asarray([query_vec], dtype="float32")
-        distances, indices = self.index.search(query_vec, k)
+    def remove(self, ids) -> int:
+        """
+        Remove vectors by id. Returns the number of vectors removed.
+        """
+        self._check_writable()
+        ids = np.asarray(ids, dtype="int64")
+        if ids.size == 0 or self.index.ntotal == 0:
+            return 0
+
+        if self.kind == "hnsw":
+            # HNSW graphs do not support deletion: rebuild without the ids
+            vecs, all_ids = self.all_vectors()
+            keep = ~np.isin(all_ids, ids)
+            index = make_index("hnsw", self.dim, metric=self.metric, **self.params)
+            index.add_with_ids(vecs[keep], all_ids[keep])
+            self.index = index
+            self.configure_search()
+            return int((~keep).sum())
+
+        return int(self.index.remove_ids(ids))
+
+    def search_batch(
+        self,
+        query_vecs,
+        k: int,
+        id_filter=None,
+        nprobe: int | None = None,
+        ef_search: int | None = None,
+    ):
+        """
+        Search many queries in one call.
+
+        Args:
+            query_vecs: (n, dim) query matrix.
+            id_filter: optional ids to restrict the search to (array-like of
+                int64), or a faiss.IDSelector.
+
+        Returns:
+            (distances float32 (n, k), ids int64 (n, k)); missing hits are -1.
+        """
+        query_vecs = np.ascontiguousarray(query_vecs, dtype="float32")
+        if query_vecs.ndim == 1:
+            query_vecs = query_vecs.reshape(1, -1)
+
+        sel = id_filter
+        if id_filter is not None and not isinstance(id_filter, faiss.IDSelector):
+            allowed = np.ascontiguousarray(id_filter, dtype="int64")
+            # the selector points into `allowed`, which lives until we return
+            sel = faiss.IDSelectorBatch(len(allowed), faiss.swig_ptr(allowed))
+
+        params = self._search_params(nprobe, ef_search, sel)
+        if params is None:
+            return self.index.search(query_vecs, k)
+        return self.index.search(query_vecs, k, params=params)
+
+    def similarities(self, distances) -> np.ndarray:
+        """
+        Cosine similarities (higher is better) for distances returned by
+        search_batch, whatever the index metric.
+        """
+        return to_cosine(distances, self.metric)
+
+    def search(self, query_vec, k: int, nprobe: int | None = None, ef_search: int | None = None):
+        distances, indices = self.search_batch(
+            query_vec, k, nprobe=nprobe, ef_search=ef_search
+        )
         return list(zip(indices[0], distances[0]))
 
     def save(self):
-        self.path.parent.mkdir(parents=True, exist_ok=True)
-        faiss.write_index(self.index, str(self.path))
+        # Write to temp files and rename so readers (FaissRegistry) never
+        # see a half-written index. Metadata goes first: the registry
+        # reloads on index mtime and then reads the metadata.
+        path = Path(self.path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        meta_path = _meta_path(path)
+        tmp_meta = meta_path.with_name(f"{meta_path.name}.tmp-{os.getpid()}")
+        tmp_meta.write_text(json.dumps(self.meta(), indent=2))
+        os.replace(tmp_meta, meta_path)
+
+        stale = _ivfdata_files(path)
+        tmp = path.with_name(f"{path.name}.tmp-{os.getpid()}")
+        if self.ondisk and self.kind in ("ivf_flat", "ivf_pq"):
+            _write_ondisk(self.index, tmp, _ivfdata_path(path))
+        else:
+            faiss.write_index(self.index, str(tmp))
+        os.replace(tmp, path)
+
+        # Keep the lists of the index replaced just now for readers that
+        # opened it before the rename; older ones are unreferenced.
+        for old in stale[:-1]:
+            old.unlink(missing_ok=True)
 
     def load(self):
-        if self.path.exists():
-            self.index = faiss.read_index(str(self.path))
+        """
+        Load for modification (build time); never memory-mapped.
+        On-disk inverted lists are copied into memory.
+        """
+        if Path(self.path).exists():
+            index = faiss.read_index(str(self.path))
+            self.ondisk = _ondisk_invlists(index)
+            if self.ondisk:
+                _invlists_to_memory(index)
+            self._set_index(index)
+            self.mmap = False
@@ -0,0 +1,164 @@
+# backend/core/item_cache.py
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from backend.config import get_settings
+
+
+class ItemCache:
+    """
+    Bounded, thread-safe LRU cache of item metadata docs.
+
+    - Entries are keyed by Mongo ObjectId (str); a side map resolves
+      FAISS numeric ids to the same entry. Only ids >= `min_numeric_id`
+      (sequence-allocated, unique) are mapped: legacy ObjectId-derived ids
+      can collide across topics, so one cached doc cannot answer for them.
+    - Entries expire after `ttl` seconds and the least recently used
+      entry is evicted past `max_size`.
+    """
+
+    def __init__(self, max_size: int = 10_000, ttl: float = 300.0, min_numeric_id: int = 0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.min_numeric_id = min_numeric_id
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._by_numeric: Dict[int, str] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # -------------------------
+    # Internal helpers (lock held)
+    # -------------------------
+
+    def _get(self, oid: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(oid)
+        if entry is None:
+            return None
+        expires_at, doc = entry
+        if expires_at < time.monotonic():
+            self._drop(oid)
+            return None
+        self._entries.move_to_end(oid)
+        return doc
+
+    def _drop(self, oid: str) -> None:
+        entry = self._entries.pop(oid, None)
+        if entry is None:
+            return
+        num_id = entry[1].get("numeric_id")
+        if num_id is not None and self._by_numeric.get(num_id) == oid:
+            del self._by_numeric[num_id]
+
+    # -------------------------
+    # Lookups
+    # -------------------------
+
+    def get_many(self, item_ids: Iterable[str]) -> Tuple[Dict[str, Dict[str, Any]], List[str]]:
+        """
+        Returns:
+            (found docs keyed by ObjectId str, ids that missed)
+        """
+        found: Dict[str, Dict[str, Any]] = {}
+        missing: List[str] = []
+        with self._lock:
+            for oid in item_ids:
+                doc = self._get(oid)
+                if doc is None:
+                    missing.append(oid)
+                else:
+                    found[oid] = doc
+            self.hits += len(found)
+            self.misses += len(missing)
+        return found, missing
+
+    def get_many_numeric(self, num_ids: Iterable[int]) -> Tuple[Dict[int, Dict[str, Any]], List[int]]:
+        """
+        Returns:
+            (found docs keyed by numeric id, numeric ids that missed)
+        """
+        found: Dict[int, Dict[str, Any]] = {}
+        missing: List[int] = []
+        with self._lock:
+            for num_id in num_ids:
+                oid = self._by_numeric.get(num_id) if num_id >= self.min_numeric_id else None
+                doc = self._get(oid) if oid is not None else None
+                if doc is None:
+                    missing.append(num_id)
+                else:
+                    found[num_id] = doc
+            self.hits += len(found)
+            self.misses += len(missing)
+        return found, missing
+
+    # -------------------------
+    # Updates / invalidation
+    # -------------------------
+
+    def put_many(self, docs: Iterable[Dict[str, Any]]) -> None:
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            for doc in docs:
+                oid = str(doc["_id"])
+                self._drop(oid)
+                self._entries[oid] = (expires_at, doc)
+                num_id = doc.get("numeric_id")
+                if num_id is not None and num_id >= self.min_numeric_id:
+                    self._by_numeric[num_id] = oid
+
+            while len(self._entries) > self.max_size:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, item_ids: Iterable[str] = (), numeric_ids: Iterable[int] = ()) -> None:
+        with self._lock:
+            for oid in item_ids:
+                self._drop(str(oid))
+            for num_id in numeric_ids:
+                oid = self._by_numeric.get(num_id)
+                if oid is not None:
+                    self._drop(oid)
+
+    def invalidate_topic(self, topic: str) -> None:
+        with self._lock:
+            stale = [
+                oid for oid, (_, doc) in self._entries.items()
+                if doc.get("topic") == topic
+            ]
+            for oid in stale:
+                self._drop(oid)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._by_numeric.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+_settings = get_settings()
+
+# Process-wide instance shared by the ranker and the routes
+item_cache = ItemCache(
+    max_size=_settings.ITEM_CACHE_SIZE,
+    ttl=_settings.ITEM_CACHE_TTL_SECONDS,
+    # db.NUMERIC_ID_BASE (not imported: db imports this module)
+    min_numeric_id=10**8,
+)
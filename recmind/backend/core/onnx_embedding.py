@@ -0,0 +1,201 @@
+# backend/core/onnx_embedding.py
+"""
+ONNX Runtime embedding backend.
+
+Exports the transformer of a SentenceTransformer model to ONNX (optionally
+int8 dynamically quantized) and reproduces its pooling + L2 normalization in
+NumPy, so callers get the same normalized float32 vectors as the torch path.
+"""
+
+import json
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+EXPORT_CONFIG = "export.json"
+MODEL_FILE = "model.onnx"
+QUANTIZED_MODEL_FILE = "model.int8.onnx"
+
+
+def export_onnx(model_name: str, out_dir: Path, quantize: bool = False) -> Path:
+    """
+    Export `model_name` to `out_dir` (model.onnx, tokenizer files,
+    export.json and, with quantize, model.int8.onnx).
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+    from sentence_transformers.models import Normalize, Pooling, Transformer
+
+    st = SentenceTransformer(model_name, device="cpu")
+    modules = list(st)
+    if (
+        not isinstance(modules[0], Transformer)
+        or not isinstance(modules[1], Pooling)
+        or any(not isinstance(m, Normalize) for m in modules[2:])
+    ):
+        raise ValueError(
+            f"{model_name}: only Transformer + Pooling (+ Normalize) models "
+            f"can be exported, got {[type(m).__name__ for m in modules]}"
+        )
+
+    pooling = modules[1].get_pooling_mode_str()
+    if pooling not in ("mean", "cls", "max"):
+        raise ValueError(f"{model_name}: unsupported pooling mode '{pooling}'")
+
+    hf_model = modules[0].auto_model.eval()
+    tokenizer = modules[0].tokenizer
+
+    dummy = tokenizer(["an example sentence"], return_tensors="pt")
+    input_names = list(dummy.keys())
+
+    class _TokenEmbeddings(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, *args):
+            out = self.model(**dict(zip(input_names, args)))
+            return out.last_hidden_state
+
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    model_path = out_dir / MODEL_FILE
+
+    dynamic_axes = {name: {0: "batch", 1: "seq"} for name in input_names}
+    dynamic_axes["token_embeddings"] = {0: "batch", 1: "seq"}
+
+    with torch.no_grad():
+        torch.onnx.export(
+            _TokenEmbeddings(hf_model),
+            tuple(dummy[name] for name in input_names),
+            str(model_path),
+            input_names=input_names,
+            output_names=["token_embeddings"],
+            dynamic_axes=dynamic_axes,
+            opset_version=14,
+        )
+
+    tokenizer.save_pretrained(str(out_dir))
+    (out_dir / EXPORT_CONFIG).write_text(json.dumps({
+        "model_name": model_name,
+        "pooling": pooling,
+        "max_seq_length": st.max_seq_length,
+        "dim": st.get_sentence_embedding_dimension(),
+    }, indent=2))
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        quantize_dynamic(
+            str(model_path),
+            str(out_dir / QUANTIZED_MODEL_FILE),
+            weight_type=QuantType.QInt8,
+        )
+
+    return out_dir
+
+
+class OnnxEncoder:
+    """
+    Drop-in for the subset of SentenceTransformer.encode used by embed_texts.
+    """
+
+    def __init__(
+        self,
+        model_dir: Path,
+        quantized: bool = False,
+        batch_size: int = 32,
+        threads: int = 0,
+    ):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        model_dir = Path(model_dir)
+        model_file = model_dir / (QUANTIZED_MODEL_FILE if quantized else MODEL_FILE)
+        if not model_file.exists():
+            raise FileNotFoundError(
+                f"ONNX model not found at {model_file}; run scripts/export_onnx.py"
+            )
+
+        config = json.loads((model_dir / EXPORT_CONFIG).read_text())
+        self.pooling = config["pooling"]
+        self.max_seq_length = config["max_seq_length"]
+        self.batch_size = batch_size
+
+        self.tokenizer = AutoTokenizer.from_pretrained(str(model_dir))
+
+        opts = ort.SessionOptions()
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            opts.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(
+            str(model_file), opts, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def _pool(self, tokens: np.ndarray, mask: np.ndarray) -> np.ndarray:
+        if self.pooling == "cls":
+            return tokens[:, 0]
+        mask = mask[:, :, None].astype(tokens.dtype)
+        if self.pooling == "max":
+            return np.where(mask > 0, tokens, -1e9).max(axis=1)
+        return (tokens * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        enc = self.tokenizer(
+            texts,
+            padding=True,
+            truncation=True,
+            max_length=self.max_seq_length,
+            return_tensors="np",
+        )
+        feeds: Dict[str, np.ndarray] = {
+            k: v.astype(np.int64) for k, v in enc.items() if k in self.input_names
+        }
+        tokens = self.session.run(None, feeds)[0]
+        return self._pool(tokens, enc["attention_mask"])
+
+    def encode(
+        self,
+        texts: List[str],
+        convert_to_numpy: bool = True,
+        normalize_embeddings: bool = True,
+    ) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, 0), dtype="float32")
+
+        # Sort by length so batches carry little padding, then restore order
+        order = np.argsort([-len(t) for t in texts], kind="stable")
+        out: List[Optional[np.ndarray]] = [None] * len(texts)
+
+        for start in range(0, len(texts), self.batch_size):
+            idx = order[start:start + self.batch_size]
+            vecs = self._encode_batch([texts[i] for i in idx])
+            for i, v in zip(idx, vecs):
+                out[i] = v
+
+        embeddings = np.stack(out).astype("float32")
+        if normalize_embeddings:
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+            embeddings /= np.clip(norms, 1e-12, None)
+        return embeddings
+
+
+def parity_check(model_name: str, model_dir: Path, quantized: bool, texts: List[str]) -> Dict[str, float]:
+    """
+    Cosine agreement between torch and ONNX embeddings of `texts`.
+    """
+    from sentence_transformers import SentenceTransformer
+
+    ref = SentenceTransformer(model_name, device="cpu").encode(
+        texts, convert_to_numpy=True, normalize_embeddings=True
+    ).astype("float32")
+    got = OnnxEncoder(model_dir, quantized=quantized).encode(texts)
+
+    cos = (ref * got).sum(axis=1)
+    return {
+        "n": len(texts),
+        "min_cosine": float(cos.min()),
+        "mean_cosine": float(cos.mean()),
+    }
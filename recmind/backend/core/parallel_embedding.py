@@ -0,0 +1,103 @@
+# backend/core/parallel_embedding.py
+"""
+Multi-process embedding for bulk jobs (index builds, CF item features).
+
+Texts are split into fixed-size shards, encoded by a pool of spawned worker
+processes that each hold their own model, and reassembled in input order.
+Each worker is limited to cpu_count // workers intra-op threads so the pool
+does not oversubscribe the machine.
+"""
+
+import atexit
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+
+import numpy as np
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def _threads_per_worker(workers: int) -> int:
+    return max(1, (os.cpu_count() or 1) // workers)
+
+
+def init_worker_threads(threads: int):
+    """
+    Cap a spawned pool worker at `threads` compute threads.
+
+    By the time an initializer runs, the child has imported its module (and
+    numpy with it), so BLAS and settings are already initialized: limits are
+    applied explicitly rather than through the environment.
+    """
+    # Still read by libraries initialized later (LightFM's OpenMP, tokenizers)
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[var] = str(threads)
+    os.environ["TOKENIZERS_PARALLELISM"] = "false"
+
+    try:
+        # Installed with scikit-learn (a sentence-transformers dependency)
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(limits=threads)
+    except ImportError:
+        pass
+
+    from backend.core import embedding
+    embedding.set_threads(threads)
+
+
+def _init_worker(threads: int):
+    init_worker_threads(threads)
+
+    from backend.core.embedding import get_model
+    get_model()
+
+
+def _encode_shard(texts: List[str]) -> np.ndarray:
+    from backend.core.embedding import embed_texts
+    # The parent already filtered out cached texts
+    return embed_texts(texts, cache=False)
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown()
+            # spawn: forked children would inherit torch's thread pools
+            _pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(_threads_per_worker(workers),),
+            )
+            _pool_workers = workers
+        return _pool
+
+
+def shutdown():
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+        _pool = None
+        _pool_workers = 0
+
+
+atexit.register(shutdown)
+
+
+def encode_parallel(texts: List[str], workers: int, shard_size: int = 256) -> np.ndarray:
+    """
+    Returns:
+        float32 (len(texts), dim), rows in input order.
+    """
+    shards = [texts[i:i + shard_size] for i in range(0, len(texts), shard_size)]
+    # map() yields results in submission order, so output is deterministic
+    results = list(_get_pool(workers).map(_encode_shard, shards))
+    return np.vstack(results).astype("float32")
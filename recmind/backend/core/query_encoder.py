@@ -0,0 +1,180 @@
+# backend/core/query_encoder.py
+
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+from backend.config import get_settings
+from backend.core.embedding import embed_texts
+
+
+def normalize_query(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def _bucket(n: int) -> str:
+    """
+    Power-of-two histogram bucket label: 1, 2-3, 4-7, ...
+    """
+    if n <= 1:
+        return str(max(n, 0))
+    lo = 1 << (n.bit_length() - 1)
+    return f"{lo}-{2 * lo - 1}"
+
+
+class QueryEncoder:
+    """
+    Query embedding service in front of embed_texts.
+
+    - LRU cache keyed by normalized query text.
+    - Cache misses from concurrent requests are collected for up to
+      `window_ms` (or `max_batch` queries) and encoded in one forward pass.
+    """
+
+    def __init__(self, cache_size: int = 10_000, window_ms: float = 5.0, max_batch: int = 64):
+        self.cache_size = cache_size
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[str, list]" = OrderedDict()  # key -> [vec, hits]
+        self._pending: Dict[str, Future] = {}
+        self._queue: "queue.Queue[str]" = queue.Queue()
+        self._worker: threading.Thread | None = None
+
+        self.hits = 0
+        self.misses = 0
+        self.batch_sizes: Dict[str, int] = {}
+
+    # -------------------------
+    # Public API
+    # -------------------------
+
+    def encode(self, query: str) -> np.ndarray:
+        return self.encode_many([query])[0]
+
+    def encode_many(self, queries: Sequence[str]) -> np.ndarray:
+        """
+        Returns:
+            float32 array (len(queries), dim), rows in input order.
+        """
+        keys = [normalize_query(q) for q in queries]
+        vecs: Dict[str, np.ndarray] = {}
+        waits: Dict[str, Future] = {}
+
+        with self._lock:
+            for key in keys:
+                if key in vecs or key in waits:
+                    continue
+                entry = self._cache.get(key)
+                if entry is not None:
+                    self._cache.move_to_end(key)
+                    entry[1] += 1
+                    self.hits += 1
+                    vecs[key] = entry[0]
+                    continue
+
+                self.misses += 1
+                fut = self._pending.get(key)
+                if fut is None:
+                    fut = Future()
+                    self._pending[key] = fut
+                    self._queue.put(key)
+                waits[key] = fut
+
+            if waits:
+                self._ensure_worker()
+
+        for key, fut in waits.items():
+            vecs[key] = fut.result()
+
+        if not keys:
+            return np.zeros((0, 0), dtype="float32")
+        return np.stack([vecs[k] for k in keys])
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            total = self.hits + self.misses
+            reuse: Dict[str, int] = {}
+            for _, hits in self._cache.values():
+                b = _bucket(hits)
+                reuse[b] = reuse.get(b, 0) + 1
+            return {
+                "cache_size": len(self._cache),
+                "cache_max_size": self.cache_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                # how often cached queries have been reused
+                "cache_hit_histogram": reuse,
+                "batch_size_histogram": dict(self.batch_sizes),
+            }
+
+    # -------------------------
+    # Micro-batching worker
+    # -------------------------
+
+    def _ensure_worker(self):
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(
+                target=self._run, name="query-encoder", daemon=True
+            )
+            self._worker.start()
+
+    def _collect(self) -> List[str]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                # The LRU above is the query cache; the persistent store is
+                # for corpus texts and would grow with every distinct query.
+                vecs = embed_texts(batch, cache=False)
+            except Exception as e:
+                with self._lock:
+                    futs = [self._pending.pop(k) for k in batch]
+                for fut in futs:
+                    fut.set_exception(e)
+                continue
+
+            with self._lock:
+                b = _bucket(len(batch))
+                self.batch_sizes[b] = self.batch_sizes.get(b, 0) + 1
+
+                futs = []
+                for key, vec in zip(batch, vecs):
+                    # A row view would keep the whole batch array alive
+                    vec = vec.copy()
+                    vec.setflags(write=False)
+                    self._cache[key] = [vec, 0]
+                    futs.append((self._pending.pop(key), vec))
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+            for fut, vec in futs:
+                fut.set_result(vec)
+
+
+_settings = get_settings()
+
+query_encoder = QueryEncoder(
+    cache_size=_settings.QUERY_CACHE_SIZE,
+    window_ms=_settings.QUERY_BATCH_WINDOW_MS,
+    max_batch=_settings.QUERY_BATCH_MAX,
+)
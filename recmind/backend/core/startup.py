@@ -0,0 +1,32 @@
+# backend/core/startup.py
+
+import time
+from contextlib import contextmanager
+from typing import Any, Dict
+
+# Reference point: first import of this module (done first in backend.main)
+_T0 = time.perf_counter()
+_stages: Dict[str, float] = {}
+_ready_at: float | None = None
+
+
+@contextmanager
+def timed(stage: str):
+    """Record how long a startup stage takes."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _stages[stage] = time.perf_counter() - start
+
+
+def mark_ready():
+    global _ready_at
+    _ready_at = time.perf_counter()
+
+
+def report() -> Dict[str, Any]:
+    return {
+        "stages_s": {k: round(v, 3) for k, v in _stages.items()},
+        "ready_s": round(_ready_at - _T0, 3) if _ready_at is not None else None,
+    }
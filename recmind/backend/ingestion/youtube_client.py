@@ -1,5 +1,4 @@
 from typing import List, Dict, Optional
-from googleapiclient.discovery import build
 from backend.config import get_settings
 from youtube_transcript_api import YouTubeTranscriptApi, TranscriptsDisabled, NoTranscriptFound
 
@@ -10,6 +9,9 @@ settings = get_settings()
 def _get_youtube_client():
     if not settings.YOUTUBE_API_KEY:
         raise RuntimeError("YOUTUBE_API_KEY not set")
+    # googleapiclient is slow to import; only load it when YouTube is queried
+    from googleapiclient.discovery import build
+
     return build("youtube", "v3", developerKey=settings.YOUTUBE_API_KEY)
 
 
@@ -1,9 +1,31 @@
+from backend.core import startup
 from fastapi import FastAPI
-from backend.recommender.routes import router as rec_router
-from backend.api import router as ml_router
 import os
 from fastapi.middleware.cors import CORSMiddleware
 
+from backend.config import get_settings
+
+# Heavy dependencies are imported one stage at a time first, so that
+# import:routes only counts the app's own modules.
+with startup.timed("import:numpy"):
+    import numpy  # noqa: F401
+with startup.timed("import:faiss"):
+    import faiss  # noqa: F401
+with startup.timed("import:pandas_pyarrow"):
+    import pandas  # noqa: F401
+    import pyarrow.parquet  # noqa: F401
+with startup.timed("import:scipy_cf"):
+    import scipy.sparse  # noqa: F401
+    import backend.recommender.cf  # noqa: F401
+with startup.timed("import:db"):
+    from backend.core import db
+
+with startup.timed("import:routes"):
+    from backend.recommender.routes import router as rec_router
+    from backend.api import router as ml_router
+
+settings = get_settings()
+
 app = FastAPI(title="recmind-ingestion")
 
 # Dev-only CORS
@@ -24,3 +46,22 @@ app.include_router(ml_router, prefix="/api/ml", tags=["ml"])
 
 # 🔑 Recommender routes (also under /api/ml)
 app.include_router(rec_router, prefix="/api/ml/recommend", tags=["recommend"])
+
+
+@app.on_event("startup")
+def warmup():
+    with startup.timed("db:indexes"):
+        try:
+            db.connect()
+        except Exception as e:
+            # Retried on first use; serve what does not need Mongo meanwhile
+            print("Mongo not ready at startup:", repr(e))
+
+    if settings.EMBEDDING_WARMUP:
+        from backend.core.embedding import warmup as warmup_embedding
+
+        with startup.timed("warmup:embedding_model"):
+            warmup_embedding()
+
+    startup.mark_ready()
+    print("Startup:", startup.report())
@@ -1,16 +1,35 @@
+import hashlib
+import json
 import os
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
 import numpy as np
 import pandas as pd
+import pyarrow.parquet as pq
 from bson import ObjectId
 
 from backend.core.embedding import embed_texts
 from backend.core.faiss_store import FaissStore
-from backend.core.db import insert_item, set_item_numeric_id
+from backend.core.db import (
+    allocate_numeric_ids,
+    get_index_state,
+    legacy_numeric_id,
+    set_content_hashes,
+    upsert_items,
+)
+from backend.core.item_cache import item_cache
 from backend.config import get_settings
 
 
 settings = get_settings()
 
+# Parquet columns build_index reads (others, e.g. readme, are never loaded)
+_COLUMNS = [
+    "ext_id", "title", "desc", "url", "topics", "transcript",
+    "stars", "viewCount", "difficulty",
+]
+
 
 def _safe_col(df: pd.DataFrame, name: str) -> pd.Series:
     """
@@ -22,13 +41,281 @@ def _safe_col(df: pd.DataFrame, name: str) -> pd.Series:
     return pd.Series([""] * len(df), index=df.index)
 
 
-def build_index(topic: str, source: str, faiss_path: str) -> int:
+def _popularity(df: pd.DataFrame) -> pd.Series:
+    """
+    GitHub stars or YouTube viewCount, 0 when missing.
+    """
+    for name in ("stars", "viewCount"):
+        if name in df.columns:
+            return pd.to_numeric(df[name], errors="coerce").fillna(0).astype(int)
+    return pd.Series([0] * len(df), index=df.index)
+
+
+def _content_hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def _texts(df: pd.DataFrame, source: str) -> List[str]:
+    titles = _safe_col(df, "title")
+    descs = _safe_col(df, "desc")
+    if source == "github":
+        topics = _safe_col(df, "topics").astype(str)
+        return (titles + " " + descs + " " + topics).tolist()
+    transcripts = _safe_col(df, "transcript")  # youtube
+    return (titles + " " + descs + " " + transcripts).tolist()
+
+
+# ------------- Checkpoints -------------
+
+def _checkpoint_path(faiss_path, source: str) -> Path:
+    path = Path(faiss_path)
+    return path.with_name(f"{path.stem}.{source}.checkpoint.json")
+
+
+def _parquet_fingerprint(parquet_path: str, chunk_size: int) -> Dict[str, int | str]:
+    st = os.stat(parquet_path)
+    return {
+        "parquet": str(parquet_path),
+        "mtime_ns": st.st_mtime_ns,
+        "size": st.st_size,
+        "chunk_size": chunk_size,
+    }
+
+
+def _read_checkpoint(path: Path, fingerprint: Dict) -> Optional[Dict]:
+    if not path.exists():
+        return None
+    ckpt = json.loads(path.read_text())
+    if ckpt.get("fingerprint") != fingerprint:
+        return None  # parquet or chunking changed: start over
+    return ckpt
+
+
+def _write_checkpoint(path: Path, fingerprint: Dict, chunks_done: int, indexed: int):
+    tmp = path.with_name(f"{path.name}.tmp-{os.getpid()}")
+    tmp.write_text(json.dumps({
+        "fingerprint": fingerprint,
+        "chunks_done": chunks_done,
+        "indexed": indexed,
+    }))
+    os.replace(tmp, path)
+
+
+# ------------- Build -------------
+
+class _IndexBuild:
+    """
+    State of one streaming build: the FAISS store, the ids it already holds,
+    and the vector changes and content hashes waiting for the next
+    checkpoint.
+    """
+
+    def __init__(self, topic: str, source: str, faiss_path):
+        self.topic = topic
+        self.source = source
+        self.faiss_path = faiss_path
+
+        self.state = get_index_state(topic, source)
+        self.seen: Set[str] = set()
+        self.store: Optional[FaissStore] = None
+        self.pending_hashes: Dict[ObjectId, str] = {}
+
+        # Replaced vectors are swapped in at commit: removing ids per chunk
+        # would rebuild an HNSW graph once per chunk.
+        self.pending_removals: List[int] = []
+        self.pending_vecs: List[np.ndarray] = []
+        self.pending_ids: List[int] = []
+
+        # A content hash only means "embedded" if the vector is in this
+        # index file; a missing or wiped index re-embeds every row.
+        self.indexed: Set[int] = set()
+        if Path(faiss_path).exists():
+            self.store = FaissStore.from_path(faiss_path, mmap=False)
+            self.indexed = set(self.store.ids().tolist())
+
+        self.embedded = 0
+
+    def _open_store(self, dim: int) -> FaissStore:
+        if self.store is None:
+            self.store = FaissStore(dim=dim, path=self.faiss_path)
+            self.store.load()
+        return self.store
+
+    def process(self, df: pd.DataFrame) -> int:
+        """
+        Upsert metadata and embed new / changed rows of one chunk.
+
+        Returns:
+            number of rows of this chunk now indexed.
+        """
+        texts = _texts(df, self.source)
+        hashes = [_content_hash(t) for t in texts]
+
+        # Rows without an ext_id are keyed by their content
+        ext_ids = [
+            e or f"sha1:{h}"
+            for e, h in zip(_safe_col(df, "ext_id").astype(str).tolist(), hashes)
+        ]
+
+        titles = _safe_col(df, "title").tolist()
+        descs = _safe_col(df, "desc").tolist()
+        urls = _safe_col(df, "url").tolist()
+        pops = _popularity(df).tolist()
+        diffs = (
+            df["difficulty"].astype(object).where(df["difficulty"].notna(), None).tolist()
+            if "difficulty" in df.columns
+            else [None] * len(df)
+        )
+
+        docs = []
+        rows: List[int] = []                    # chunk row of each doc
+        dirty: List[int] = []                   # positions in docs to (re-)embed
+        replaced: List[tuple[int, int]] = []    # (position, numeric id of old vector)
+
+        for i, ext_id in enumerate(ext_ids):
+            # The same ext_id can appear twice in one parquet; keep the first
+            if ext_id in self.seen:
+                continue
+            self.seen.add(ext_id)
+
+            existing = self.state.get(ext_id)
+            changed = (
+                existing is None
+                or existing.get("content_hash") != hashes[i]
+                or existing.get("numeric_id") not in self.indexed
+            )
+
+            if existing is None:
+                oid = ObjectId()
+                numeric_id = None  # allocated in bulk below
+            elif existing.get("numeric_id") is None:
+                # Indexed before numeric_id was stored: drop the legacy vector
+                # and re-embed under a freshly allocated id.
+                oid = existing["_id"]
+                numeric_id = None
+                replaced.append((len(docs), legacy_numeric_id(oid)))
+                changed = True
+            else:
+                oid = existing["_id"]
+                numeric_id = existing["numeric_id"]
+                if changed and numeric_id in self.indexed:
+                    replaced.append((len(docs), numeric_id))
+
+            if changed:
+                dirty.append(len(docs))
+
+            doc = {
+                "_id": oid,
+                "numeric_id": numeric_id,
+                "source": self.source,
+                "ext_id": ext_id,
+                "title": titles[i],
+                "desc": descs[i],
+                "url": urls[i],
+                "topic": self.topic,
+                "popularity": pops[i],
+                "difficulty": diffs[i],
+            }
+            if changed:
+                # cleared until the new vector is saved
+                doc["content_hash"] = None
+            docs.append(doc)
+            rows.append(i)
+
+        new_docs = [d for d in docs if d["numeric_id"] is None]
+        for doc, numeric_id in zip(new_docs, allocate_numeric_ids(len(new_docs))):
+            doc["numeric_id"] = numeric_id
+
+        print(
+            f"Chunk rows: {len(docs)} | new / missing: {len(dirty) - len(replaced)} "
+            f"| changed: {len(replaced)} | unchanged: {len(docs) - len(dirty)}"
+        )
+
+        # ------------- Store metadata (one bulk upsert per chunk) -------------
+        failed = set(upsert_items(docs, chunk_size=settings.MONGO_BULK_CHUNK_SIZE))
+        if failed:
+            print(f"Mongo upsert failed for {len(failed)} rows")
+            dirty = [j for j in dirty if j not in failed]
+            replaced = [(j, old) for j, old in replaced if j not in failed]
+
+        if not dirty:
+            return len(docs) - len(failed)
+
+        # ------------- Embed new / changed rows, update FAISS -------------
+        vecs = np.array(
+            embed_texts(
+                [texts[rows[j]] for j in dirty],
+                workers=settings.EMBEDDING_WORKERS,
+            )
+        )
+        if vecs.ndim == 1:
+            vecs = vecs.reshape(1, -1)
+        elif vecs.ndim != 2:
+            raise ValueError(f"Unexpected embedding shape: {vecs.shape}")
+
+        store = self._open_store(vecs.shape[1])
+        ids = np.array([docs[j]["numeric_id"] for j in dirty], dtype="int64")
+        if replaced:
+            # A changed row keeps its numeric id: its new vector can only be
+            # added once the old one is removed.
+            swap = np.isin(np.array(dirty), [j for j, _ in replaced])
+            self.pending_removals.extend(old for _, old in replaced)
+            self.pending_vecs.append(vecs[swap])
+            self.pending_ids.extend(ids[swap].tolist())
+            vecs, ids = vecs[~swap], ids[~swap]
+        if len(ids):
+            store.upsert(vecs, ids)
+
+        for j in dirty:
+            self.pending_hashes[docs[j]["_id"]] = hashes[rows[j]]
+        self.embedded += len(dirty)
+
+        return len(docs) - len(failed)
+
+    def commit(self, final: bool = False):
+        """
+        Persist the index, then mark its rows as embedded.
+        """
+        if self.store is None:
+            return
+        if self.pending_removals:
+            self.store.remove(self.pending_removals)
+            self.store.upsert(np.concatenate(self.pending_vecs), self.pending_ids)
+            self.pending_removals, self.pending_vecs, self.pending_ids = [], [], []
+        promoted = final and self.store.maybe_promote()
+        if promoted:
+            print("FAISS index promoted to:", self.store.kind)
+        if self.pending_hashes or promoted:
+            self.store.save()
+            set_content_hashes(self.pending_hashes)
+            self.pending_hashes = {}
+
+
+def build_index(
+    topic: str,
+    source: str,
+    faiss_path: str,
+    chunk_size: Optional[int] = None,
+    resume: bool = True,
+) -> int:
     """
     Build / extend FAISS index for one (topic, source) pair.
 
+    Incremental and idempotent: items are keyed by (topic, source, ext_id)
+    and keep a stable numeric id. Only rows that are new or whose embedded
+    text changed (content hash) are embedded; changed rows replace their
+    previous vector.
+
+    Streaming: the parquet is read in row batches of `chunk_size`
+    (settings.INDEX_CHUNK_SIZE) and each batch is embedded and written on
+    its own, so memory does not grow with the parquet. Every
+    settings.INDEX_CHECKPOINT_CHUNKS chunks the index is saved and a
+    checkpoint written; with `resume`, an interrupted build continues after
+    the last checkpoint.
+
     Returns:
-        number of items indexed for this call.
-        If 0, nothing was added (empty parquet or no usable rows).
+        number of parquet rows now indexed for this (topic, source).
+        If 0, nothing was indexed (empty parquet or no usable rows).
     """
 
     print("=== BUILD INDEX START ===")
@@ -41,106 +328,42 @@ def build_index(topic: str, source: str, faiss_path: str) -> int:
     if not os.path.exists(parquet_path):
         raise FileNotFoundError(f"Missing parquet file: {parquet_path}")
 
-    df = pd.read_parquet(parquet_path)
-    print("Parquet loaded. Rows:", len(df))
+    pf = pq.ParquetFile(parquet_path)
+    print("Parquet rows:", pf.metadata.num_rows)
 
     # If no rows, nothing to index
-    if df.empty:
+    if pf.metadata.num_rows == 0:
         print("Parquet is empty. Nothing to index.")
         return 0
 
-    # ------------- Construct text fields safely -------------
-    if source == "github":
-        titles = _safe_col(df, "title")
-        descs = _safe_col(df, "desc")
-        topics = _safe_col(df, "topics").astype(str)
-        texts = (titles + " " + descs + " " + topics).tolist()
-    else:  # youtube
-        titles = _safe_col(df, "title")
-        descs = _safe_col(df, "desc")
-        transcripts = _safe_col(df, "transcript")
-        texts = (titles + " " + descs + " " + transcripts).tolist()
+    chunk_size = chunk_size or settings.INDEX_CHUNK_SIZE
+    fingerprint = _parquet_fingerprint(parquet_path, chunk_size)
+    ckpt_path = _checkpoint_path(faiss_path, source)
 
-    print("Texts constructed:", len(texts))
+    ckpt = _read_checkpoint(ckpt_path, fingerprint) if resume else None
+    skip = ckpt["chunks_done"] if ckpt else 0
+    indexed = ckpt["indexed"] if ckpt else 0
+    if skip:
+        print(f"Resuming after chunk {skip} ({indexed} rows already indexed)")
 
-    if not texts:
-        print("No texts found. Exiting.")
-        return 0
+    build = _IndexBuild(topic, source, faiss_path)
+    columns = [c for c in _COLUMNS if c in pf.schema_arrow.names]
 
-    # ------------- Generate embeddings -------------
-    vecs = embed_texts(texts)
-    vecs = np.array(vecs)
+    for n, batch in enumerate(pf.iter_batches(batch_size=chunk_size, columns=columns)):
+        if n < skip:
+            continue
 
-    print("Embeddings generated. Shape:", vecs.shape)
-
-    if vecs.size == 0:
-        print("No embeddings generated. Exiting.")
-        return 0
-
-    if vecs.ndim == 1:
-        vecs = vecs.reshape(1, -1)
-    elif vecs.ndim != 2:
-        raise ValueError(f"Unexpected embedding shape: {vecs.shape}")
-
-    n_docs, dim = vecs.shape
-    print("Docs:", n_docs, "Dim:", dim)
-
-    # ------------- Store metadata + build numeric IDs -------------
-    ids: list[int] = []
-
-    print("Starting MongoDB inserts...")
-    print("Mongo URI:", settings.MONGO_URI)
-
-    for idx, (_, row) in enumerate(df.iterrows()):
-        doc = {
-            "source": source,
-            "ext_id": str(row.get("ext_id", "")),
-            "title": row.get("title", ""),
-            "desc": row.get("desc", ""),
-            "url": row.get("url", ""),
-            "topic": topic,
-            "popularity": int(row.get("stars", row.get("viewCount", 0))),
-            "difficulty": row.get("difficulty", None),
-        }
-
-        try:
-            inserted_id = insert_item(doc)
-            print(f"[{idx}] Inserted Mongo ID:", inserted_id)
-        except Exception as e:
-            print(f"[{idx}] Mongo insert FAILED:", repr(e))
-            raise
-
-        if inserted_id is None:
-            raise RuntimeError("insert_item() returned None")
-
-        numeric_id = int(str(inserted_id)[-8:], 16) % (10**8)
-
-        try:
-            set_item_numeric_id(inserted_id, numeric_id)
-            print(f"[{idx}] numeric_id set:", numeric_id)
-        except Exception as e:
-            print(f"[{idx}] Failed to set numeric_id:", repr(e))
-            raise
-
-        ids.append(numeric_id)
-
-    print("Mongo inserts completed. Total:", len(ids))
-
-    if len(ids) != n_docs:
-        raise ValueError(
-            f"IDs count ({len(ids)}) != embeddings count ({n_docs}) "
-            f"for topic={topic}, source={source}"
-        )
+        indexed += build.process(batch.to_pandas())
 
-    # ------------- Build / update FAISS index -------------
-    print("Updating FAISS index...")
+        if (n + 1) % settings.INDEX_CHECKPOINT_CHUNKS == 0:
+            build.commit()
+            _write_checkpoint(ckpt_path, fingerprint, n + 1, indexed)
 
-    store = FaissStore(dim=dim, path=faiss_path)
-    store.load()
-    store.upsert(vecs, ids)
-    store.save()
+    build.commit(final=True)
+    ckpt_path.unlink(missing_ok=True)
+    item_cache.invalidate_topic(topic)
 
-    print("FAISS update complete.")
+    print("FAISS update complete. Embedded:", build.embedded)
     print("=== BUILD INDEX END ===")
 
-    return len(ids)
+    return indexed
@@ -1,110 +1,283 @@
 # backend/recommender/cf.py
 
+import json
+import os
 import pickle
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+import shutil
+from datetime import datetime
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple, Union
 from pathlib import Path
 
 import numpy as np
 from scipy import sparse
-from sklearn.decomposition import PCA
-from lightfm import LightFM
 
 from backend.core import db
 from backend.core.embedding import embed_texts
 from backend.core.faiss_store import FaissStore
 from backend.core.paths import MODEL_DIR
+from backend.config import get_settings
+
+# lightfm / sklearn are imported where they are used so that serving
+# processes that never train (or have no model yet) do not load them.
+if TYPE_CHECKING:
+    from lightfm import LightFM
+
+settings = get_settings()
 
 MODEL_DIR.mkdir(parents=True, exist_ok=True)
 
+# Versioned model artifacts: MODEL_DIR/cf/<topic>/<version>/ + CURRENT pointer
+CF_DIR = MODEL_DIR / "cf"
+ARTIFACT_FORMAT = 1
+
+# LightFM state saved per artifact (optimizer state is kept for fit_partial)
+_MODEL_ARRAYS = [
+    f"{side}_{name}"
+    for side in ("user", "item")
+    for name in (
+        "embeddings", "embedding_gradients", "embedding_momentum",
+        "biases", "bias_gradients", "bias_momentum",
+    )
+]
+
+
+class _IdMap:
+    """
+    Read-only id -> code map over a key array in code order and its argsort,
+    both of which can be memory-mapped. Supports the dict operations CFModel
+    uses (in, [], get, len).
+    """
+
+    def __init__(self, keys: np.ndarray, sorter: Optional[np.ndarray] = None):
+        self.keys = keys
+        self.sorter = np.argsort(keys, kind="stable") if sorter is None else sorter
+
+    @classmethod
+    def from_index(cls, index: Union[Dict[str, int], "_IdMap"]) -> "_IdMap":
+        if isinstance(index, _IdMap):
+            return index
+        keys = [""] * len(index)
+        for key, code in index.items():
+            keys[code] = key
+        return cls(np.array(keys, dtype=str))
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def lookup(self, keys) -> np.ndarray:
+        """
+        Codes of `keys` (vectorized), -1 for unknown keys.
+        """
+        # natural width: casting to the key width could truncate into a match
+        found = np.asarray(keys, dtype=str)
+        if len(self.keys) == 0:
+            return np.full(len(found), -1, dtype=np.int32)
+        pos = np.minimum(np.searchsorted(self.keys, found, sorter=self.sorter), len(self.keys) - 1)
+        codes = self.sorter[pos].astype(np.int32)
+        codes[self.keys[codes] != found] = -1
+        return codes
+
+    def get(self, key: str, default: Optional[int] = None) -> Optional[int]:
+        code = self.lookup([key])[0]
+        return int(code) if code >= 0 else default
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def __getitem__(self, key: str) -> int:
+        code = self.get(key)
+        if code is None:
+            raise KeyError(key)
+        return code
+
+    def to_dict(self) -> Dict[str, int]:
+        return {str(k): i for i, k in enumerate(self.keys)}
+
+
+class _Projection:
+    """
+    A fitted PCA reduced to what transform() needs, so serving and updates
+    do not depend on pickled sklearn objects.
+    """
+
+    def __init__(self, components_: np.ndarray, mean_: np.ndarray):
+        self.components_ = components_
+        self.mean_ = mean_
+
+    def transform(self, X) -> np.ndarray:
+        return (np.asarray(X, dtype=np.float32) - self.mean_) @ self.components_.T
+
+
+def _write_atomic(path: Path, text: str):
+    tmp = path.with_name(f"{path.name}.tmp-{os.getpid()}")
+    tmp.write_text(text)
+    os.replace(tmp, path)
+
 
 class CFModel:
     """
     LightFM-based collaborative filtering model, per topic.
     """
 
-    def __init__(self, topic: str, faiss_store: FaissStore):
+    def __init__(self, topic: str, faiss_store: Optional[FaissStore] = None):
         self.topic = topic
         self.faiss = faiss_store
 
-        self.model: Optional[LightFM] = None
-        self.pca: Optional[PCA] = None
+        self.model: Optional["LightFM"] = None
+        self.pca: Optional[_Projection] = None
         self.item_features: Optional[sparse.csr_matrix] = None
 
-        self.user_index: Dict[str, int] = {}
-        self.item_index: Dict[str, int] = {}
-        self.rev_item_index: List[str] = []
+        # dicts while training; memory-mapped _IdMaps once loaded
+        self.user_index: Union[Dict[str, int], _IdMap] = {}
+        self.item_index: Union[Dict[str, int], _IdMap] = {}
+        self.rev_item_index: Union[List[str], np.ndarray] = []
+
+        self.version: Optional[str] = None
+
+        # Item representations for scoring, computed once per loaded model
+        self._item_map: Optional[_IdMap] = None
+        self._item_repr: Optional[np.ndarray] = None
+        self._item_repr_bias: Optional[np.ndarray] = None
 
     # -------------------------
     # Paths & status helpers
     # -------------------------
 
     def _model_path(self) -> Path:
+        """Legacy single-pickle model (read-only fallback)."""
         safe = self.topic.replace("/", "_")
         return MODEL_DIR / f"{safe}.pkl"
 
-    def is_trained(self) -> bool:
-        return self._model_path().exists()
+    def _artifact_root(self) -> Path:
+        return CF_DIR / self.topic.replace("/", "_")
 
-    def is_stale(self, days: int = 15) -> bool:
-        path = self._model_path()
-        if not path.exists():
-            return False
-        mtime = datetime.utcfromtimestamp(path.stat().st_mtime)
-        return datetime.utcnow() - mtime > timedelta(days=days)
+    def _current_path(self) -> Path:
+        return self._artifact_root() / "CURRENT"
+
+    def current_version(self) -> Optional[str]:
+        """Version the CURRENT pointer names, or None."""
+        try:
+            return self._current_path().read_text().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def artifact_version(self) -> Optional[str]:
+        """
+        Identifies the model on disk: the CURRENT version, or the legacy
+        pickle's mtime. None when the topic has no model.
+        """
+        version = self.current_version()
+        if version is not None:
+            return version
+        try:
+            return f"legacy:{self._model_path().stat().st_mtime_ns}"
+        except FileNotFoundError:
+            return None
+
+    def is_trained(self) -> bool:
+        return self._current_path().exists() or self._model_path().exists()
 
     # -------------------------
     # Data preparation
     # -------------------------
 
-    def _interaction_weight(self, r: dict) -> float:
-        weight = 0.0
-        if r.get("liked") is True:
-            weight += 2.0
-        if r.get("saved") is True:
-            weight += 2.5
-        if "rating" in r and isinstance(r["rating"], (int, float)):
-            weight += float(r["rating"])
-        if weight == 0.0:
-            weight = 1.0
-        return weight
-
-    def _load_interactions(self):
-        inters = db.get_interactions_by_topic(self.topic)
-        items = db.get_items_by_topic(self.topic)
-
+    def _load_training_data(self):
+        """
+        One ordered pass over the topic's items; the id maps, the
+        interaction matrix columns and the feature rows all follow it.
+        """
+        items = db.get_cf_items(self.topic)
         item_ids = [str(it["_id"]) for it in items]
-        users = sorted({i["user_id"] for i in inters})
+
+        # Weights are computed and summed per (user, item) in Mongo
+        users, user_codes, inter_items, weights = db.get_interaction_arrays(self.topic)
 
         uidx = {u: i for i, u in enumerate(users)}
         iidx = {iid: i for i, iid in enumerate(item_ids)}
 
-        rows, cols, vals = [], [], []
+        rows = np.asarray(user_codes, dtype=np.int32)
+        cols = self._item_columns(item_ids, inter_items)
+
+        X = self._interaction_matrix(rows, cols, weights, len(users) or 1, len(item_ids))
+
+        return X, uidx, iidx, item_ids, items
 
-        for r in inters:
-            iid = str(r["item_id"])
-            uid = r["user_id"]
-            if iid in iidx and uid in uidx:
-                rows.append(uidx[uid])
-                cols.append(iidx[iid])
-                vals.append(self._interaction_weight(r))
+    @staticmethod
+    def _item_columns(item_ids: List[str], inter_items: List[str]) -> np.ndarray:
+        """
+        Column of each interaction's item in item_ids, -1 when unknown
+        (e.g. an item added after the items pass).
+        """
+        return _IdMap(np.array(item_ids, dtype="U24")).lookup(inter_items)
+
+    @staticmethod
+    def _interaction_matrix(rows, cols, weights, n_users: int, n_items: int) -> sparse.coo_matrix:
+        vals = np.asarray(weights, dtype=np.float32)
+        valid = cols >= 0
+        return sparse.coo_matrix(
+            (vals[valid], (rows[valid], cols[valid])),
+            shape=(n_users, n_items),
+        )
 
-        X = sparse.coo_matrix(
-            (vals, (rows, cols)),
-            shape=(len(users) or 1, len(item_ids)),
+    def _check_alignment(self, X: sparse.spmatrix, items: List[dict]):
+        n = len(self.rev_item_index)
+        if not (X.shape[1] == self.item_features.shape[0] == len(self.item_index) == n):
+            raise RuntimeError(
+                f"CF data misaligned for {self.topic}: interactions {X.shape[1]}, "
+                f"features {self.item_features.shape[0]}, index {len(self.item_index)}, "
+                f"items {n}"
+            )
+        for i, (iid, it) in enumerate(zip(self.rev_item_index, items)):
+            if self.item_index[iid] != i or str(it["_id"]) != iid:
+                raise RuntimeError(f"CF item order mismatch for {self.topic} at row {i}")
+
+    def _item_vectors(self, items: List[dict]) -> np.ndarray:
+        """
+        Item vectors aligned with `items`: read back from the topic's FAISS
+        index by numeric_id, so CF and RAG share the same embeddings. Items
+        missing from the index are embedded from title + desc.
+        """
+        n = len(items)
+        # Items indexed before numeric_id was stored live under the legacy id
+        numeric_ids = np.array(
+            [
+                it["numeric_id"] if it.get("numeric_id") is not None
+                else db.legacy_numeric_id(it["_id"])
+                for it in items
+            ],
+            dtype="int64",
         )
 
-        return X, uidx, iidx, item_ids
+        if self.faiss is not None and self.faiss.index.ntotal:
+            vecs, found = self.faiss.vectors(numeric_ids)
+        else:
+            vecs, found = None, np.zeros(n, dtype=bool)
 
-    def _build_item_features(self, item_ids: List[str]) -> sparse.csr_matrix:
-        items = db.get_items_by_ids(item_ids)
-        texts = [f"{it.get('title', '')} {it.get('desc', '')}" for it in items]
+        missing = np.flatnonzero(~found)
+        if len(missing):
+            print(f"[CF] {self.topic}: embedding {len(missing)}/{n} items not in FAISS")
+            texts = [
+                f"{items[i].get('title', '')} {items[i].get('desc', '')}"
+                for i in missing
+            ]
+            embedded = embed_texts(texts, workers=settings.EMBEDDING_WORKERS)
+            if vecs is None:
+                vecs = np.zeros((n, embedded.shape[1]), dtype="float32")
+            vecs[missing] = embedded
 
-        vecs = embed_texts(texts)
+        return vecs
+
+    def _build_item_features(self, items: List[dict]) -> sparse.csr_matrix:
+        from sklearn.decomposition import PCA
+
+        vecs = self._item_vectors(items)
 
         k = min(50, vecs.shape[1])
-        self.pca = PCA(n_components=k, random_state=42)
-        feats = self.pca.fit_transform(vecs)
+        pca = PCA(n_components=k, random_state=42)
+        feats = pca.fit_transform(vecs)
+        self.pca = _Projection(
+            pca.components_.astype(np.float32), pca.mean_.astype(np.float32)
+        )
 
         return sparse.csr_matrix(feats)
 
@@ -112,14 +285,17 @@ class CFModel:
     # Train / save / load
     # -------------------------
 
-    def fit(self):
-        X, uidx, iidx, item_ids = self._load_interactions()
+    def fit(self, num_threads: int = 4):
+        from lightfm import LightFM
+
+        X, uidx, iidx, item_ids, items = self._load_training_data()
 
         self.user_index = uidx
         self.item_index = iidx
         self.rev_item_index = item_ids
 
-        self.item_features = self._build_item_features(item_ids)
+        self.item_features = self._build_item_features(items)
+        self._check_alignment(X, items)
 
         self.model = LightFM(
             loss="warp",
@@ -131,26 +307,215 @@ class CFModel:
             X.tocsr(),
             item_features=self.item_features,
             epochs=15,
-            num_threads=4,
+            num_threads=num_threads,
+        )
+
+        self._save()
+
+    # -------------------------
+    # Incremental update
+    # -------------------------
+
+    def _grow_users(self, n_new: int):
+        """
+        Append rows for new users to the user embeddings, biases and the
+        optimizer state, initialized the way LightFM initializes them.
+        """
+        m = self.model
+        k = m.no_components
+        acc = 1.0 if m.learning_schedule == "adagrad" else 0.0
+
+        emb = ((m.random_state.rand(n_new, k) - 0.5) / k).astype(np.float32)
+        m.user_embeddings = np.vstack([m.user_embeddings, emb])
+        m.user_embedding_gradients = np.vstack(
+            [m.user_embedding_gradients, np.full((n_new, k), acc, dtype=np.float32)]
+        )
+        m.user_embedding_momentum = np.vstack(
+            [m.user_embedding_momentum, np.zeros((n_new, k), dtype=np.float32)]
+        )
+        m.user_biases = np.concatenate([m.user_biases, np.zeros(n_new, dtype=np.float32)])
+        m.user_bias_gradients = np.concatenate(
+            [m.user_bias_gradients, np.full(n_new, acc, dtype=np.float32)]
+        )
+        m.user_bias_momentum = np.concatenate(
+            [m.user_bias_momentum, np.zeros(n_new, dtype=np.float32)]
+        )
+
+    def _add_items(self, items: List[dict]):
+        """
+        Append new items to the item index, with features from the fitted PCA.
+        """
+        feats = self.pca.transform(self._item_vectors(items))
+        self.item_features = sparse.vstack(
+            [self.item_features, sparse.csr_matrix(feats)], format="csr"
+        ).astype(np.float32)
+
+        for it in items:
+            iid = str(it["_id"])
+            self.item_index[iid] = len(self.rev_item_index)
+            self.rev_item_index.append(iid)
+
+    def update(self, since: datetime, epochs: int = 3, num_threads: int = 4) -> bool:
+        """
+        Warm-start the trained model with interactions updated after `since`:
+        new users and items are appended to the indexes and a few
+        fit_partial epochs run on the recent interactions only.
+
+        Returns:
+            False when there is no trained model to update (use fit()).
+        """
+        if self.model is None and not self.load():
+            return False
+
+        # Loaded id maps are read-only arrays; grow them as dicts
+        if isinstance(self.user_index, _IdMap):
+            self.user_index = self.user_index.to_dict()
+        if isinstance(self.item_index, _IdMap):
+            self.item_index = self.item_index.to_dict()
+        self.rev_item_index = [str(i) for i in self.rev_item_index]
+
+        new_items = [
+            it for it in db.get_cf_items(self.topic)
+            if str(it["_id"]) not in self.item_index
+        ]
+        if new_items:
+            self._add_items(new_items)
+
+        users, user_codes, inter_items, weights = db.get_interaction_arrays(
+            self.topic, since=since
+        )
+        new_users = [u for u in users if u not in self.user_index]
+        for u in new_users:
+            self.user_index[u] = len(self.user_index)
+        if new_users:
+            self._grow_users(len(new_users))
+
+        print(
+            f"[CF] {self.topic}: update with {len(weights)} interactions, "
+            f"{len(new_users)} new users, {len(new_items)} new items"
+        )
+
+        user_map = np.array([self.user_index[u] for u in users], dtype=np.int32)
+        rows = user_map[np.asarray(user_codes, dtype=np.int32)]
+        cols = self._item_columns(self.rev_item_index, inter_items)
+
+        X = self._interaction_matrix(
+            rows, cols, weights, len(self.user_index), len(self.rev_item_index)
         )
 
+        if X.nnz:
+            self.model.fit_partial(
+                X.tocsr(),
+                item_features=self.item_features,
+                epochs=epochs,
+                num_threads=num_threads,
+            )
+
         self._save()
+        return True
 
     def _save(self):
-        payload = {
+        """
+        Write a new artifact version, then point CURRENT at it. Readers
+        only ever follow CURRENT to a complete directory.
+        """
+        root = self._artifact_root()
+        root.mkdir(parents=True, exist_ok=True)
+
+        version = datetime.utcnow().strftime("%Y%m%dT%H%M%S%f")
+        tmp = root / f".tmp-{version}-{os.getpid()}"
+        tmp.mkdir()
+
+        for name in _MODEL_ARRAYS:
+            np.save(tmp / f"{name}.npy", np.ascontiguousarray(getattr(self.model, name)))
+
+        feats = sparse.csr_matrix(self.item_features, dtype=np.float32)
+        np.save(tmp / "item_features.data.npy", feats.data)
+        np.save(tmp / "item_features.indices.npy", feats.indices.astype(np.int32))
+        np.save(tmp / "item_features.indptr.npy", feats.indptr.astype(np.int32))
+
+        for name, index in (("user_ids", self.user_index), ("item_ids", self.item_index)):
+            idmap = _IdMap.from_index(index)
+            np.save(tmp / f"{name}.npy", idmap.keys)
+            np.save(tmp / f"{name}.sorter.npy", idmap.sorter)
+
+        np.save(tmp / "pca_components.npy", np.asarray(self.pca.components_, dtype=np.float32))
+        np.save(tmp / "pca_mean.npy", np.asarray(self.pca.mean_, dtype=np.float32))
+
+        params = {k: v for k, v in self.model.get_params().items() if k != "random_state"}
+        manifest = {
+            "format": ARTIFACT_FORMAT,
+            "version": version,
             "topic": self.topic,
-            "model": self.model,
-            "user_index": self.user_index,
-            "item_index": self.item_index,
-            "rev_item_index": self.rev_item_index,
-            "pca": self.pca,
-            "item_features": self.item_features,
+            "trained_at": datetime.utcnow().isoformat(),
+            "n_users": len(self.user_index),
+            "n_items": len(self.item_index),
+            "item_feature_dim": int(feats.shape[1]),
+            "params": params,
         }
-
-        with self._model_path().open("wb") as f:
-            pickle.dump(payload, f)
+        (tmp / "manifest.json").write_text(json.dumps(manifest, indent=2))
+
+        os.rename(tmp, root / version)
+        _write_atomic(self._current_path(), version)
+        self.version = version
+        self._reset_scoring()
+
+        self._prune_versions(keep=settings.CF_KEEP_VERSIONS)
+
+    def _prune_versions(self, keep: int):
+        """
+        Delete all but the newest `keep` versions. Serving processes that
+        still map a deleted version keep working.
+        """
+        root = self._artifact_root()
+        current = self.current_version()
+        versions = sorted(
+            p for p in root.iterdir()
+            if p.is_dir() and not p.name.startswith(".")
+        )
+        for p in versions[:-keep]:
+            if p.name != current:
+                shutil.rmtree(p, ignore_errors=True)
 
     def load(self) -> bool:
+        """
+        Load the CURRENT artifact (arrays memory-mapped copy-on-write, so
+        pages are shared between processes and LightFM can still use them),
+        falling back to a legacy pickle.
+        """
+        version = self.current_version()
+        if version is None:
+            return self._load_pickle()
+
+        from lightfm import LightFM
+
+        path = self._artifact_root() / version
+        manifest = json.loads((path / "manifest.json").read_text())
+        if manifest.get("format") != ARTIFACT_FORMAT:
+            raise ValueError(f"Unsupported CF artifact format in {path}: {manifest.get('format')}")
+
+        def arr(name: str) -> np.ndarray:
+            return np.load(path / f"{name}.npy", mmap_mode="c")
+
+        model = LightFM(random_state=42, **manifest["params"])
+        for name in _MODEL_ARRAYS:
+            setattr(model, name, arr(name))
+
+        self.model = model
+        self.user_index = _IdMap(arr("user_ids"), arr("user_ids.sorter"))
+        self.item_index = _IdMap(arr("item_ids"), arr("item_ids.sorter"))
+        self.rev_item_index = self.item_index.keys
+        self.item_features = sparse.csr_matrix(
+            (arr("item_features.data"), arr("item_features.indices"), arr("item_features.indptr")),
+            shape=(manifest["n_items"], manifest["item_feature_dim"]),
+        )
+        self.pca = _Projection(arr("pca_components"), arr("pca_mean"))
+        self.version = version
+        self._reset_scoring()
+
+        return True
+
+    def _load_pickle(self) -> bool:
         path = self._model_path()
         if not path.exists():
             return False
@@ -165,9 +530,100 @@ class CFModel:
         self.rev_item_index = p["rev_item_index"]
         self.pca = p["pca"]
         self.item_features = p["item_features"]
+        self.version = "legacy"
+        self._reset_scoring()
 
         return True
 
+    # -------------------------
+    # Scoring
+    # -------------------------
+
+    def _reset_scoring(self):
+        self._item_map = None
+        self._item_repr = None
+        self._item_repr_bias = None
+
+    def _ensure_scoring(self) -> bool:
+        """
+        Load the model if needed and cache item representations
+        (item_features @ item_embeddings / item_biases, as LightFM's
+        get_item_representations computes them).
+        """
+        if self.model is None and not self.load():
+            return False
+        if self._item_repr is None:
+            feats = sparse.csr_matrix(self.item_features, dtype=np.float32)
+            self._item_repr = np.ascontiguousarray(
+                feats @ np.asarray(self.model.item_embeddings), dtype=np.float32
+            )
+            self._item_repr_bias = np.asarray(
+                feats @ np.asarray(self.model.item_biases), dtype=np.float32
+            ).ravel()
+            self._item_map = _IdMap.from_index(self.item_index)
+        return True
+
+    def score_all(self, user_id: str) -> Optional[np.ndarray]:
+        """
+        Scores of every item of the topic for one user (same values as
+        LightFM.predict), in item code order. None for unknown users.
+        """
+        if not self._ensure_scoring():
+            return None
+        u = self.user_index.get(user_id)
+        if u is None:
+            return None
+        return self._item_repr @ self.model.user_embeddings[u] + (
+            self._item_repr_bias + self.model.user_biases[u]
+        )
+
+    def score_users(self, user_ids: List[str]) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """
+        Scores of every item for many users in one matrix product.
+
+        Returns:
+            (row, scores): row[i] is user_ids[i]'s row in scores, -1 for
+            unknown users; scores is (known users, items), None when there
+            is no model.
+        """
+        rows = np.full(len(user_ids), -1, dtype=np.int64)
+        if not self._ensure_scoring():
+            return rows, None
+
+        codes = np.array([self.user_index.get(u, -1) for u in user_ids], dtype=np.int64)
+        known = np.flatnonzero(codes >= 0)
+        rows[known] = np.arange(len(known))
+
+        users = codes[known]
+        scores = self.model.user_embeddings[users] @ self._item_repr.T
+        scores += self._item_repr_bias
+        scores += self.model.user_biases[users][:, None]
+        return rows, scores
+
+    def top_from_scores(self, scores: np.ndarray, n: int) -> List[Tuple[str, float]]:
+        """
+        n best items of a full score row (score_all / score_users).
+        """
+        n = min(n, len(scores))
+        if n <= 0:
+            return []
+        top = np.argpartition(-scores, n - 1)[:n]
+        top = top[np.argsort(-scores[top])]
+
+        keys = self._item_map.keys
+        return [(str(keys[i]), float(scores[i])) for i in top]
+
+    def candidate_scores(self, scores: np.ndarray, candidate_ids: List[str]) -> Dict[str, float]:
+        """
+        predict() for a full score row: scores of the known candidates.
+        """
+        codes = self._item_map.lookup(candidate_ids)
+        return {
+            cid: float(scores[code])
+            for cid, code in zip(candidate_ids, codes)
+            if code >= 0
+        }
+
     # -------------------------
     # Predict
     # -------------------------
@@ -178,29 +634,22 @@ class CFModel:
         candidate_ids: List[str],
     ) -> Optional[Dict[str, float]]:
 
-        if self.model is None and not self.load():
+        if not self._ensure_scoring():
             return None
 
-        if user_id not in self.user_index:
+        u = self.user_index.get(user_id)
+        if u is None:
             return None  # cold-start user → fallback to RAG
 
-        uidx = self.user_index[user_id]
-
-        valid_pairs = [
-            (cid, self.item_index[cid])
-            for cid in candidate_ids
-            if cid in self.item_index
-        ]
-
-        if not valid_pairs:
+        codes = self._item_map.lookup(candidate_ids)
+        valid = codes >= 0
+        if not valid.any():
             return None
 
-        cids, idxs = zip(*valid_pairs)
-
-        scores = self.model.predict(
-            uidx,
-            np.array(idxs, dtype=np.int32),
-            item_features=self.item_features,
+        codes = codes[valid]
+        scores = self._item_repr[codes] @ self.model.user_embeddings[u] + (
+            self._item_repr_bias[codes] + self.model.user_biases[u]
         )
 
+        cids = [cid for cid, ok in zip(candidate_ids, valid) if ok]
         return {cid: float(score) for cid, score in zip(cids, scores)}
@@ -0,0 +1,142 @@
+# backend/recommender/cf_registry.py
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from backend.config import get_settings
+from backend.recommender.cf import CFModel
+
+
+class _Entry:
+    __slots__ = ("model", "version", "checked_at")
+
+    def __init__(self, model: Optional[CFModel], version: Optional[str]):
+        self.model = model
+        self.version = version
+        self.checked_at = time.monotonic()
+
+
+class CFRegistry:
+    """
+    Process-wide cache of loaded CF models.
+
+    - Keyed by (normalized) topic; each model is loaded once, with its item
+      representations precomputed, so predict is only matrix math.
+    - Every `check_interval` seconds a lookup re-reads the topic's CURRENT
+      pointer; a new version is loaded and swapped in atomically, in-flight
+      requests keep the old object.
+    - Topics without a model are cached too (as None), so untrained topics
+      do not touch the filesystem on every request.
+    - Evicts least recently used models beyond `max_models`.
+    """
+
+    def __init__(self, max_models: int, check_interval: float = 5.0):
+        self.max_models = max_models
+        self.check_interval = check_interval
+
+        self._lock = threading.Lock()
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+
+        self.hits = 0
+        self.loads = 0
+        self.reloads = 0
+        self.evictions = 0
+
+    def _load_lock(self, topic: str) -> threading.Lock:
+        with self._lock:
+            return self._load_locks.setdefault(topic, threading.Lock())
+
+    def get(self, topic: str) -> Optional[CFModel]:
+        """
+        Loaded model for a topic, or None if it has not been trained.
+        """
+        with self._lock:
+            entry = self._entries.get(topic)
+            if entry is not None:
+                self._entries.move_to_end(topic)
+                if time.monotonic() - entry.checked_at < self.check_interval:
+                    self.hits += 1
+                    return entry.model
+
+        probe = CFModel(topic)
+        version = probe.artifact_version()
+
+        if entry is not None and entry.version == version:
+            entry.checked_at = time.monotonic()
+            with self._lock:
+                self.hits += 1
+            return entry.model
+
+        # Load outside the registry lock so other topics keep serving
+        with self._load_lock(topic):
+            with self._lock:
+                current = self._entries.get(topic)
+            if current is not None and current.version == version:
+                return current.model
+
+            model = None
+            if version is not None and probe.load():
+                probe._ensure_scoring()
+                model = probe
+                # CURRENT may have moved between the probe and the load
+                if probe.version != "legacy":
+                    version = probe.version
+
+            with self._lock:
+                if topic in self._entries:
+                    self.reloads += 1
+                elif model is not None:
+                    self.loads += 1
+                self._entries[topic] = _Entry(model, version)
+                self._entries.move_to_end(topic)
+                self._evict()
+
+        return model
+
+    def _evict(self) -> None:
+        loaded = [t for t, e in self._entries.items() if e.model is not None]
+        while len(loaded) > self.max_models:
+            self._entries.pop(loaded.pop(0))
+            self.evictions += 1
+        # Negative entries are cheap, but keep their number bounded as well
+        while len(self._entries) > 4 * self.max_models:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, topic: str) -> None:
+        with self._lock:
+            self._entries.pop(topic, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "loaded": sum(e.model is not None for e in self._entries.values()),
+                "max_models": self.max_models,
+                "hits": self.hits,
+                "loads": self.loads,
+                "reloads": self.reloads,
+                "evictions": self.evictions,
+                "models": {
+                    topic: {
+                        "version": e.version,
+                        "users": len(e.model.user_index),
+                        "items": len(e.model.item_index),
+                    }
+                    for topic, e in self._entries.items()
+                    if e.model is not None
+                },
+            }
+
+
+_settings = get_settings()
+
+cf_registry = CFRegistry(
+    max_models=_settings.CF_CACHE_MAX_MODELS,
+    check_interval=_settings.CF_RELOAD_CHECK_SECONDS,
+)
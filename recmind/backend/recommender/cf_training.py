@@ -0,0 +1,231 @@
+# backend/recommender/cf_training.py
+"""
+CF training orchestrator for all topics.
+
+Topics are checked against a per-topic watermark (interaction count and
+latest interaction timestamp at the last training run) and only those with
+new signal are updated (fit_partial) or fully retrained, in parallel, in a
+pool of spawned processes that each get a share of the CPUs for LightFM. A summary report
+of every run is written to MODEL_DIR/cf_training_report.json.
+"""
+
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from backend.core import db
+from backend.core.parallel_embedding import init_worker_threads
+from backend.core.paths import MODEL_DIR
+from backend.config import get_settings
+
+settings = get_settings()
+
+REPORT_PATH = MODEL_DIR / "cf_training_report.json"
+
+
+def _safe_topic(topic: str) -> str:
+    return topic.replace("/", "_")
+
+
+def _watermark_path(topic: str) -> Path:
+    return MODEL_DIR / f"{_safe_topic(topic)}.watermark.json"
+
+
+def _write_json(path: Path, payload: Dict[str, Any]):
+    tmp = path.with_name(f"{path.name}.tmp-{os.getpid()}")
+    tmp.write_text(json.dumps(payload, indent=2, default=str))
+    os.replace(tmp, path)
+
+
+def read_watermark(topic: str) -> Optional[Dict[str, Any]]:
+    path = _watermark_path(topic)
+    if not path.exists():
+        return None
+    wm = json.loads(path.read_text())
+    for key in ("last_ts", "trained_at", "full_trained_at"):
+        if wm.get(key):
+            wm[key] = datetime.fromisoformat(wm[key])
+    return wm
+
+
+def training_decision(topic: str, trained: bool) -> Dict[str, Any]:
+    """
+    Returns:
+        {"mode": "fit" | "update" | None, "reason": str,
+         "signal": current interaction signal, "since": watermark timestamp}
+    """
+    wm = read_watermark(topic) if trained else None
+    since = wm["last_ts"] if wm else None
+    signal = db.get_interaction_watermark(topic, since=since)
+
+    def decide(mode: Optional[str], reason: str) -> Dict[str, Any]:
+        return {"mode": mode, "reason": reason, "signal": signal, "since": since}
+
+    if signal["count"] == 0:
+        return decide(None, "no interactions")
+    if not trained:
+        return decide("fit", "no model")
+    if wm is None or since is None:
+        return decide("fit", "no watermark")
+
+    new = max(signal["new"], signal["count"] - wm.get("count", 0))
+    if new == 0:
+        return decide(None, "no new interactions")
+
+    full_at = wm.get("full_trained_at") or wm["trained_at"]
+    age_days = (datetime.utcnow() - full_at).total_seconds() / 86400
+    if age_days > settings.CF_RETRAIN_MAX_AGE_DAYS:
+        return decide("fit", f"{new} new, last full fit {age_days:.1f} days ago")
+
+    if not settings.CF_INCREMENTAL:
+        if new >= settings.CF_RETRAIN_MIN_NEW:
+            return decide("fit", f"{new} new interactions")
+        return decide(None, f"{new} new interactions")
+
+    if new >= settings.CF_RETRAIN_MIN_NEW and new > settings.CF_FULL_RETRAIN_RATIO * signal["count"]:
+        return decide("fit", f"{new} new of {signal['count']} interactions")
+    return decide("update", f"{new} new interactions")
+
+
+# -------------------------
+# Worker
+# -------------------------
+
+def _train_topic(
+    topic: str,
+    threads: int,
+    signal: Dict[str, Any],
+    mode: str,
+    since: Optional[datetime],
+) -> Dict[str, Any]:
+    from backend.core.faiss_store import FaissStore
+    from backend.recommender.cf import CFModel
+
+    start = time.perf_counter()
+
+    # Only topics that are actually trained pay for loading their index
+    try:
+        faiss_store = FaissStore.from_topic(topic)
+    except FileNotFoundError:
+        print(f"[CF] No FAISS index for {topic}, embedding item features")
+        faiss_store = None
+
+    cf = CFModel(topic, faiss_store)
+    prev = read_watermark(topic) or {}
+    now = datetime.utcnow()
+
+    if mode == "update" and cf.update(
+        since, epochs=settings.CF_UPDATE_EPOCHS, num_threads=threads
+    ):
+        full_trained_at = prev.get("full_trained_at") or prev.get("trained_at") or now
+    else:
+        mode = "fit"
+        cf.fit(num_threads=threads)
+        full_trained_at = now
+
+    duration = time.perf_counter() - start
+    _write_json(_watermark_path(topic), {
+        "count": signal["count"],
+        "last_ts": signal["last_ts"].isoformat() if signal["last_ts"] else None,
+        "trained_at": now.isoformat(),
+        "full_trained_at": full_trained_at.isoformat(),
+        "mode": mode,
+        "duration_s": round(duration, 3),
+    })
+    return {"mode": mode, "duration_s": round(duration, 3)}
+
+
+# -------------------------
+# Orchestrator
+# -------------------------
+
+def train_all(
+    topics: Optional[List[str]] = None,
+    workers: Optional[int] = None,
+    threads: Optional[int] = None,
+    force: bool = False,
+) -> Dict[str, Any]:
+    """
+    Retrain the CF models of `topics` (default: every topic) that have
+    new interaction signal, `workers` topics at a time with `threads`
+    LightFM threads each. Small amounts of new signal are folded in with a
+    warm-start update; a full fit runs for new models, large changes and
+    once the last full fit is older than CF_RETRAIN_MAX_AGE_DAYS.
+    force=True runs a full fit for every topic with interactions.
+
+    Returns:
+        the summary report (also written to REPORT_PATH).
+    """
+    from backend.recommender.cf import CFModel
+
+    workers = workers or settings.CF_TRAIN_WORKERS
+    threads = threads or settings.CF_TRAIN_THREADS or max(1, (os.cpu_count() or 1) // workers)
+    topics = topics if topics is not None else db.get_topics()
+
+    started = datetime.utcnow()
+    t0 = time.perf_counter()
+    results: Dict[str, Dict[str, Any]] = {}
+    todo: Dict[str, Dict[str, Any]] = {}
+
+    for topic in topics:
+        decision = training_decision(topic, CFModel(topic).is_trained())
+        results[topic] = {
+            "status": "skipped",
+            "reason": decision["reason"],
+            "interactions": decision["signal"]["count"],
+        }
+        if force and decision["signal"]["count"]:
+            decision["mode"] = "fit"
+        if decision["mode"]:
+            todo[topic] = decision
+        else:
+            print(f"[SKIP] {topic}: {decision['reason']}")
+
+    if todo:
+        print(f"[TRAIN] {len(todo)} topics, {workers} workers x {threads} threads")
+        pool = ProcessPoolExecutor(
+            max_workers=min(workers, len(todo)),
+            # spawn: forked children would inherit BLAS / torch thread pools
+            mp_context=multiprocessing.get_context("spawn"),
+            # LightFM gets num_threads=threads per fit; this caps BLAS and
+            # the embedding model used for item features
+            initializer=init_worker_threads,
+            initargs=(threads,),
+        )
+        with pool:
+            futures = {
+                pool.submit(
+                    _train_topic, topic, threads, d["signal"], d["mode"], d["since"]
+                ): topic
+                for topic, d in todo.items()
+            }
+            for fut in as_completed(futures):
+                topic = futures[fut]
+                try:
+                    results[topic].update(status="trained", **fut.result())
+                    print(
+                        f"[DONE] {topic} ({results[topic]['mode']}) "
+                        f"in {results[topic]['duration_s']}s"
+                    )
+                except Exception as e:
+                    results[topic].update(status="failed", error=repr(e))
+                    print(f"[FAIL] {topic}: {e!r}")
+
+    report = {
+        "started_at": started.isoformat(),
+        "duration_s": round(time.perf_counter() - t0, 3),
+        "workers": workers,
+        "threads": threads,
+        "trained": sum(r["status"] == "trained" for r in results.values()),
+        "updated": sum(r.get("mode") == "update" for r in results.values()),
+        "failed": sum(r["status"] == "failed" for r in results.values()),
+        "skipped": sum(r["status"] == "skipped" for r in results.values()),
+        "topics": results,
+    }
+    _write_json(REPORT_PATH, report)
+    return report
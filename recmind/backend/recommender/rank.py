@@ -1,14 +1,61 @@
 # backend/recommender/rank.py
 
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
 from backend.recommender.zero_shot import ZeroShotRanker
 from backend.recommender.cf import CFModel
 
+# Users whose CF score rows are computed in one matrix product
+_CF_BATCH_USERS = 256
+
+
+def blend(
+    zs: Dict[str, float],
+    cf_scores: Optional[Dict[str, float]],
+    cf_top: Optional[List[Tuple[str, float]]],
+    k: int,
+    alpha: float,
+) -> List[Tuple[str, float]]:
+    """
+    Combine zero-shot (RAG) scores with CF scores of those candidates
+    and CF's own top items.
+
+    Returns:
+        List[(mongo_item_id (str), score)] sorted desc.
+    """
+    if not zs:
+        return []
+
+    # If CF model not trained or returned nothing → RAG-only
+    if not cf_scores:
+        return sorted(zs.items(), key=lambda x: x[1], reverse=True)[:k]
+
+    cf_scores = dict(cf_scores)
+    cf_scores.update(cf_top or [])
+
+    # LightFM scores are unbounded; scale them to [0, 1] so alpha mixes
+    # them with cosine-based RAG scores on a comparable scale.
+    lo, hi = min(cf_scores.values()), max(cf_scores.values())
+    cf_scores = {iid: (s - lo) / (hi - lo + 1e-8) for iid, s in cf_scores.items()}
+
+    # CF-only candidates get the weakest RAG score rather than 0,
+    # which would rank them above every RAG hit.
+    zs_floor = min(zs.values())
+    final = {
+        iid: alpha * cf_scores.get(iid, 0.0) + (1 - alpha) * zs.get(iid, zs_floor)
+        for iid in set(zs) | set(cf_scores)
+    }
+
+    return sorted(final.items(), key=lambda x: x[1], reverse=True)[:k]
+
 
 def rank_hybrid(
     user_id,
     topic,
     zero_shot: ZeroShotRanker,
-    cf_model: CFModel,
+    cf_model: Optional[CFModel],
     query: str,
     k: int = 20,
     alpha: float = 0.5,
@@ -18,7 +65,9 @@ def rank_hybrid(
     Combine zero-shot (RAG) and CF scores.
 
     - zero_shot.score_items returns: Dict[mongo_item_id (str) -> score]
-    - cf_model.predict returns: Optional[Dict[mongo_item_id (str) -> score]]
+    - cf_model.score_all scores the whole topic once for the user; the RAG
+      candidates' CF scores and the user's k * 5 best CF items (added as
+      candidates next to the RAG hits) both come from that row
 
     Returns:
         List[(mongo_item_id (str), score)] sorted desc.
@@ -31,20 +80,64 @@ def rank_hybrid(
 
     # If CF is disabled, just return RAG-only ranking
     if not use_cf:
-        return sorted(zs.items(), key=lambda x: x[1], reverse=True)[:k]
+        return blend(zs, None, None, k, alpha)
 
-    # 2. Get CF scores for these candidates
-    candidate_ids = list(zs.keys())
-    cf_scores = cf_model.predict(user_id, candidate_ids)
-
-    # If CF model not trained or returned nothing → RAG-only
-    if not cf_scores:
-        return sorted(zs.items(), key=lambda x: x[1], reverse=True)[:k]
+    # 2. Get CF scores for these candidates, plus CF's own top items
+    scores = cf_model.score_all(user_id)  # None → cold-start user / no model
+    cf_scores = cf_model.candidate_scores(scores, list(zs)) if scores is not None else None
+    cf_top = cf_model.top_from_scores(scores, k * 5) if cf_scores else None
 
     # 3. Combine RAG + CF
-    final = {
-        iid: alpha * cf_scores.get(iid, 0.0) + (1 - alpha) * zs[iid]
-        for iid in zs
-    }
+    return blend(zs, cf_scores, cf_top, k, alpha)
 
-    return sorted(final.items(), key=lambda x: x[1], reverse=True)[:k]
+
+def rank_hybrid_batch(
+    topic: str,
+    zero_shot: ZeroShotRanker,
+    cf_model: Optional[CFModel],
+    requests: Sequence[Tuple[str, str, int, float]],
+    qvecs: Optional[np.ndarray] = None,
+) -> List[List[Tuple[str, float]]]:
+    """
+    rank_hybrid for many (user_id, query, k, alpha) requests of one topic:
+    queries are embedded (unless qvecs, one row per request, is given) and
+    searched together, and CF scores of up to _CF_BATCH_USERS users come
+    from one matrix product.
+
+    Returns:
+        one ranked List[(mongo_item_id (str), score)] per request.
+    """
+    zs_rows = zero_shot.score_items_batch(
+        topic,
+        [q for _, q, _, _ in requests],
+        [k * 5 for _, _, k, _ in requests],
+        qvecs=qvecs,
+    )
+
+    cf_scores: List[Optional[Dict[str, float]]] = [None] * len(requests)
+    cf_tops: List[Optional[List[Tuple[str, float]]]] = [None] * len(requests)
+
+    if cf_model is not None:
+        by_user: Dict[str, List[int]] = {}
+        for i, (user_id, _, _, _) in enumerate(requests):
+            if zs_rows[i]:
+                by_user.setdefault(user_id, []).append(i)
+
+        users = list(by_user)
+        for start in range(0, len(users), _CF_BATCH_USERS):
+            chunk = users[start:start + _CF_BATCH_USERS]
+            rows, scores = cf_model.score_users(chunk)
+            if scores is None:
+                break
+            for user_id, row in zip(chunk, rows):
+                if row < 0:
+                    continue  # cold-start user → RAG only
+                for i in by_user[user_id]:
+                    k = requests[i][2]
+                    cf_scores[i] = cf_model.candidate_scores(scores[row], list(zs_rows[i]))
+                    cf_tops[i] = cf_model.top_from_scores(scores[row], k * 5)
+
+    return [
+        blend(zs_rows[i], cf_scores[i], cf_tops[i], k, alpha)
+        for i, (_, _, k, alpha) in enumerate(requests)
+    ]
@@ -1,20 +1,24 @@
 # backend/recommender/routes.py
 
 import os
+from typing import Dict, List
+
 from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel, Field
 
 from backend.config import get_settings
 from backend.core import db
 from backend.core.utils import write_parquet
-from backend.core.faiss_store import FaissStore
+from backend.core.faiss_registry import faiss_registry
+from backend.core.query_encoder import query_encoder
 
 from backend.ingestion.github_client import search_repos, fetch_readme
 from backend.ingestion.youtube_client import search_videos, fetch_transcript
 
 from backend.recommender.builder import build_index
 from backend.recommender.zero_shot import ZeroShotRanker
-from backend.recommender.cf import CFModel
-from backend.recommender.rank import rank_hybrid
+from backend.recommender.cf_registry import cf_registry
+from backend.recommender.rank import rank_hybrid, rank_hybrid_batch
 
 from backend.core.paths import (
     RAW_GITHUB_DIR,
@@ -35,6 +39,34 @@ def _normalize_topic(topic: str) -> str:
     )
 
 
+class RecommendationRequest(BaseModel):
+    user_id: str
+    topic: str
+    q: str
+    k: int = Field(default=10, ge=1, le=100)
+    alpha: float = Field(default=0.5, ge=0.0, le=1.0)
+
+
+class BatchRecommendationRequest(BaseModel):
+    requests: List[RecommendationRequest] = Field(..., max_length=1000)
+
+
+def _format_items(ranked, id_map, used_cf: bool):
+    return [
+        {
+            "id": str(id_map[i]["_id"]),
+            "title": id_map[i]["title"],
+            "url": id_map[i]["url"],
+            "source": id_map[i]["source"],
+            "desc": id_map[i].get("desc", ""),
+            "score": s,
+            "used_cf": used_cf,
+        }
+        for i, s in ranked
+        if i in id_map
+    ]
+
+
 def _run_full_rag_pipeline_for_topic(topic: str) -> None:
     max_per_source = min(settings.MAX_PER_SOURCE, 200)
 
@@ -99,11 +131,11 @@ def recommendations(
     print("=============================================\n")
 
     try:
-        faiss_store = FaissStore.from_topic(safe_topic)
+        faiss_store = faiss_registry.get(safe_topic)
     except FileNotFoundError:
         _run_full_rag_pipeline_for_topic(topic)
         try:
-            faiss_store = FaissStore.from_topic(safe_topic)
+            faiss_store = faiss_registry.get(safe_topic)
         except FileNotFoundError:
             raise HTTPException(
                 status_code=500,
@@ -111,7 +143,7 @@ def recommendations(
             )
 
     zs = ZeroShotRanker(faiss_store)
-    cf = CFModel(safe_topic, faiss_store)
+    cf = cf_registry.get(safe_topic)  # None until the topic is trained
 
     ranked = rank_hybrid(
         user_id=user_id,
@@ -121,7 +153,7 @@ def recommendations(
         query=q,
         k=k,
         alpha=alpha,
-        use_cf=cf.is_trained(),
+        use_cf=cf is not None,
     )
 
     item_ids = [iid for iid, _ in ranked]
@@ -129,18 +161,66 @@ def recommendations(
 
     id_map = {str(it["_id"]): it for it in items}
 
+    return _format_items(ranked, id_map, used_cf=cf is not None)
+
+
+@router.post("/recommendations/batch")
+def recommendations_batch(body: BatchRecommendationRequest):
+    """
+    Many (user_id, topic, q, k, alpha) requests in one call. Requests are
+    grouped by topic; all queries are embedded in one encoder call, each
+    group is searched and CF-scored in bulk, and all item metadata is
+    fetched with one lookup. Topics without
+    an index return no items (run /recommendations or /build_index first).
+
+    Returns:
+        one {"user_id", "topic", "items"} per request, in request order.
+    """
+    reqs = body.requests
+
+    groups: Dict[str, List[int]] = {}
+    for i, r in enumerate(reqs):
+        groups.setdefault(_normalize_topic(r.topic), []).append(i)
+
+    stores = {}
+    for safe_topic in groups:
+        try:
+            stores[safe_topic] = faiss_registry.get(safe_topic)
+        except FileNotFoundError:
+            continue
+
+    # One encoder call for the queries of every indexed topic
+    order = [i for safe_topic in stores for i in groups[safe_topic]]
+    qvecs = query_encoder.encode_many([reqs[i].q for i in order]) if order else None
+    row_of = {i: row for row, i in enumerate(order)}
+
+    ranked: List[list] = [[] for _ in reqs]
+    used_cf = [False] * len(reqs)
+
+    for safe_topic, faiss_store in stores.items():
+        idxs = groups[safe_topic]
+        cf = cf_registry.get(safe_topic)
+        rows = rank_hybrid_batch(
+            topic=safe_topic,
+            zero_shot=ZeroShotRanker(faiss_store),
+            cf_model=cf,
+            requests=[(reqs[i].user_id, reqs[i].q, reqs[i].k, reqs[i].alpha) for i in idxs],
+            qvecs=qvecs[[row_of[i] for i in idxs]],
+        )
+        for i, row in zip(idxs, rows):
+            ranked[i] = row
+            used_cf[i] = cf is not None
+
+    item_ids = list({iid for row in ranked for iid, _ in row})
+    id_map = {str(it["_id"]): it for it in db.get_items_by_ids(item_ids)}
+
     return [
         {
-            "id": str(id_map[i]["_id"]),
-            "title": id_map[i]["title"],
-            "url": id_map[i]["url"],
-            "source": id_map[i]["source"],
-            "desc": id_map[i].get("desc", ""),
-            "score": s,
-            "used_cf": cf.is_trained(),
+            "user_id": r.user_id,
+            "topic": r.topic,
+            "items": _format_items(ranked[i], id_map, used_cf[i]),
         }
-        for i, s in ranked
-        if i in id_map
+        for i, r in enumerate(reqs)
     ]
 
 
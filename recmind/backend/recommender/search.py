@@ -1,23 +1,34 @@
-from backend.core.embedding import embed_texts
-from backend.core.faiss_store import FaissStore
-from backend.core.db import get_item_by_numeric_id
+from backend.core.query_encoder import query_encoder
+from backend.core.faiss_registry import faiss_registry
+from backend.core.db import get_items_by_numeric_ids
 
 
 def search(topic: str, query: str, k: int, faiss_path: str):
     # Generate query embedding
-    vec = embed_texts([query])[0]
+    vec = query_encoder.encode(query)
 
-    # Load FAISS index
-    store = FaissStore(dim=len(vec), path=faiss_path)
-    store.load()
+    # Load FAISS index (cached per process, reloaded when rebuilt)
+    try:
+        store = faiss_registry.get_path(faiss_path)
+    except FileNotFoundError:
+        return []
 
     # Perform vector search
-    results = store.search(vec, k)
+    distances, indices = store.search_batch(vec, k)
+    ids, dists = indices[0], distances[0]
+    hit = ids != -1
+    # Cosine similarity (higher is better) for both IP and L2 indexes
+    sims = store.similarities(dists)
 
     # Fetch matching metadata from MongoDB
+    docs = get_items_by_numeric_ids(ids[hit].tolist())
+    doc_map = {
+        doc["numeric_id"]: doc for doc in docs if doc.get("topic") == topic
+    }
+
     items = []
-    for item_id, score in results:
-        doc = get_item_by_numeric_id(item_id)
+    for item_id, score in zip(ids[hit].tolist(), sims[hit].tolist()):
+        doc = doc_map.get(item_id)
         if doc and doc.get("topic") == topic:
             items.append({
                 "metadata": {
@@ -1,10 +1,10 @@
 # backend/recommender/zero_shot.py
 
-from typing import Dict, List
+from typing import Dict, List, Optional
 import numpy as np
 
 from backend.core import db
-from backend.core.embedding import embed_texts
+from backend.core.query_encoder import query_encoder
 from backend.core.faiss_store import FaissStore
 
 
@@ -57,41 +57,78 @@ class ZeroShotRanker:
             Dict[mongo_item_id (str), score (float)]
         """
         # 1. Embed the query (shape: (embed_dim,))
-        qvec = embed_texts([query])[0]
+        qvec = query_encoder.encode(query)
 
-        # 2. Search FAISS index: returns list of (faiss_numeric_id, distance)
-        results = self.faiss.search(qvec, k=k)
-        if not results:
-            return {}
+        # 2. Search FAISS index: (1, k) distances and numeric ids
+        distances, indices = self.faiss.search_batch(qvec, k)
+        return self._score_hits(topic, [(indices[0], distances[0])])[0]
 
-        # Filter out invalid slots (-1, max_float)
-        filtered: List[tuple[int, float]] = [
-            (int(i), float(d))
-            for i, d in results
-            if i != -1
+    def score_items_batch(
+        self,
+        topic: str,
+        queries: List[str],
+        ks: List[int],
+        qvecs: Optional[np.ndarray] = None,
+    ) -> List[Dict[str, float]]:
+        """
+        score_items for many queries of one topic: one encoder call, one
+        multi-row FAISS search and one Mongo lookup for all hits.
+        qvecs: the queries' embeddings, when the caller already encoded them.
+
+        Returns:
+            one Dict[mongo_item_id (str), score (float)] per query.
+        """
+        if not queries:
+            return []
+
+        if qvecs is None:
+            qvecs = query_encoder.encode_many(queries)
+        distances, indices = self.faiss.search_batch(qvecs, max(ks))
+        return self._score_hits(
+            topic,
+            [(indices[r, :k], distances[r, :k]) for r, k in enumerate(ks)],
+        )
+
+    def _score_hits(self, topic: str, hits) -> List[Dict[str, float]]:
+        """
+        Args:
+            hits: per query, (numeric ids, distances) from FAISS.
+        """
+        # 3. Resolve numeric_id -> Mongo doc (one indexed $in lookup for all rows)
+        all_ids = np.unique(np.concatenate([ids for ids, _ in hits]))
+        all_ids = all_ids[all_ids != -1]
+        if all_ids.size == 0:
+            return [{} for _ in hits]
+
+        docs = db.get_items_by_numeric_ids(all_ids.tolist())
+        # Legacy ids can collide across topics; prefer docs from this topic.
+        doc_map = {
+            doc["numeric_id"]: doc for doc in docs if doc.get("topic") == topic
+        }
+
+        return [
+            self._score_row(ids, self.faiss.similarities(dists), doc_map)
+            for ids, dists in hits
         ]
-        if not filtered:
-            return {}
 
-        # 3. Resolve numeric_id -> Mongo doc
-        # (we'll use your existing helper get_item_by_numeric_id)
+    def _score_row(self, ids, cosines, doc_map: Dict[int, dict]) -> Dict[str, float]:
         sims = []
         pops = []
         mongo_ids: List[str] = []
 
-        for num_id, dist in filtered:
-            doc = db.get_item_by_numeric_id(num_id)
-            if not doc:
+        for num_id, cos in zip(ids, cosines):
+            # Filter out invalid slots (-1, max_float)
+            if num_id == -1:
                 continue
-            if doc.get("topic") != topic:
+            doc = doc_map.get(int(num_id))
+            if not doc:
                 continue
 
             mongo_id_str = str(doc["_id"])
             mongo_ids.append(mongo_id_str)
 
-            # FAISS gives L2 distance: smaller is better.
-            # Convert to similarity by negating distance.
-            sims.append(-float(dist))
+            # Cosine similarity in [-1, 1], whatever the index metric
+            sims.append(float(cos))
 
             # Popularity from doc (stars / viewCount)
             pops.append(float(doc.get("popularity", 0.0)))
@@ -106,7 +143,6 @@ class ZeroShotRanker:
         pops_norm = _minmax(pops)
 
         # 5. Final zero-shot score (higher is better)
-        # You could also min-max sims, but negating distance already helps.
         zs = self.w1 * sims + self.w2 * pops_norm
 
         return {mongo_ids[i]: float(zs[i]) for i in range(len(mongo_ids))}
@@ -0,0 +1,28 @@
+import sys
+from pathlib import Path
+
+# Add project root to PYTHONPATH
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT))
+
+from backend.core import db
+
+
+def main():
+    updated = db.backfill_numeric_ids()
+    print(f"[BACKFILL] numeric_id written on {updated} items")
+
+    dups = db.find_duplicate_numeric_ids()
+    if not dups:
+        db.rebuild_unique_indexes()
+        print("[OK] numeric_id values are unique")
+        return
+
+    print(f"[WARN] {len(dups)} numeric_id values are shared by several items:")
+    for d in dups:
+        ids = ", ".join(str(i) for i in d["item_ids"])
+        print(f"  - {d['_id']}: {ids}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+import sys
+from pathlib import Path
+
+# Add project root to PYTHONPATH
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT))
+
+from backend.core.faiss_store import convert_to_mmap_layout
+from backend.core.paths import FAISS_DIR
+
+
+def main():
+    paths = sorted(FAISS_DIR.glob("*.index"))
+    if not paths:
+        print(f"[SKIP] No FAISS indexes in {FAISS_DIR}")
+        return
+
+    for path in paths:
+        try:
+            print(f"[OK] {path.name}: {convert_to_mmap_layout(path)}")
+        except Exception as e:
+            print(f"[FAIL] {path.name}: {e!r}")
+
+
+if __name__ == "__main__":
+    main()
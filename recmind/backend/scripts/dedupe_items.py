@@ -0,0 +1,54 @@
+import sys
+from pathlib import Path
+
+# Add project root to PYTHONPATH
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT))
+
+from backend.core import db
+from backend.core.faiss_store import FaissStore
+
+
+def main():
+    """
+    Collapse items ingested more than once under the same
+    (topic, source, ext_id): keep the oldest doc, move the interactions of
+    the others onto it, delete them from Mongo and drop their vectors from
+    the topic's FAISS index.
+    """
+    dups = db.find_duplicate_items()
+    print(f"[DEDUPE] {len(dups)} duplicated (topic, source, ext_id) keys")
+
+    by_topic = {}
+    kept_of = {}
+    for group in dups:
+        topic = group["_id"]["topic"]
+        kept, *extra = group["items"]
+        by_topic.setdefault(topic, []).extend(extra)
+        for it in extra:
+            kept_of[it["_id"]] = kept["_id"]
+
+    for topic, extra in by_topic.items():
+        # Likes / saves / ratings must follow the kept doc before the rest go
+        moved = db.repoint_interactions({it["_id"]: kept_of[it["_id"]] for it in extra})
+        print(f"[OK] {topic}: moved {moved} interactions to kept items")
+
+        deleted = db.delete_items([it["_id"] for it in extra])
+        num_ids = [it["numeric_id"] for it in extra if it.get("numeric_id") is not None]
+
+        try:
+            store = FaissStore.from_topic(topic, mmap=False)
+        except FileNotFoundError:
+            print(f"[SKIP] {topic}: deleted {deleted} docs, no FAISS index")
+            continue
+
+        removed = store.remove(num_ids)
+        store.save()
+        print(f"[OK] {topic}: deleted {deleted} docs, removed {removed} vectors")
+
+    db.rebuild_unique_indexes()
+    print("[OK] unique item indexes in place")
+
+
+if __name__ == "__main__":
+    main()
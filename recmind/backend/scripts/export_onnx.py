@@ -0,0 +1,56 @@
+import argparse
+import sys
+from pathlib import Path
+
+# Add project root to PYTHONPATH
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT))
+
+from backend.core.embedding import MODEL_NAME, onnx_model_dir
+from backend.core.onnx_embedding import export_onnx, parity_check
+
+PARITY_TEXTS = [
+    "python basics",
+    "machine learning course for beginners",
+    "React hooks tutorial with examples",
+    "Distributed systems: consensus, replication and Raft",
+    "awesome-python: a curated list of Python frameworks, libraries and resources",
+    "How to build a REST API with FastAPI and MongoDB",
+    "Linear algebra for deep learning, explained visually",
+    "kubernetes",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the embedding model to ONNX.")
+    parser.add_argument("--model", default=MODEL_NAME)
+    parser.add_argument("--quantize", action="store_true", help="also write an int8 model")
+    parser.add_argument("--skip-export", action="store_true", help="only run the parity check")
+    parser.add_argument("--min-cosine", type=float, default=0.99)
+    args = parser.parse_args()
+
+    out_dir = onnx_model_dir() if args.model == MODEL_NAME else (
+        onnx_model_dir().parent / args.model.replace("/", "_")
+    )
+
+    if not args.skip_export:
+        export_onnx(args.model, out_dir, quantize=args.quantize)
+        print(f"[EXPORT] {args.model} -> {out_dir}")
+
+    ok = True
+    variants = [False, True] if args.quantize else [False]
+    for quantized in variants:
+        res = parity_check(args.model, out_dir, quantized, PARITY_TEXTS)
+        label = "int8" if quantized else "fp32"
+        passed = res["min_cosine"] >= args.min_cosine
+        ok = ok and passed
+        print(
+            f"[{'OK' if passed else 'FAIL'}] {label}: "
+            f"min cosine={res['min_cosine']:.5f} mean={res['mean_cosine']:.5f} (n={res['n']})"
+        )
+
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
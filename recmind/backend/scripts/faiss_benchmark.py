@@ -0,0 +1,137 @@
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+# Add project root to PYTHONPATH
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT))
+
+import faiss
+import numpy as np
+
+from backend.core.faiss_store import FaissStore, make_index, _normalize_topic
+from backend.core.paths import FAISS_DIR
+
+# (kind, build params, query-time sweep)
+CONFIGS = [
+    ("flat", {}, [{}]),
+    ("ivf_flat", {}, [{"nprobe": n} for n in (1, 4, 8, 16, 32, 64)]),
+    ("ivf_pq", {}, [{"nprobe": n} for n in (4, 16, 64)]),
+    ("hnsw", {"hnsw_m": 32}, [{"ef_search": e} for e in (16, 32, 64, 128, 256)]),
+]
+
+
+def _recall(found: np.ndarray, truth: np.ndarray) -> float:
+    hits = sum(len(set(f) & set(t)) for f, t in zip(found, truth))
+    return hits / truth.size
+
+
+def benchmark(topic: str, k: int, n_queries: int):
+    store = FaissStore.from_topic(topic, mmap=False)
+    vecs, ids = store.all_vectors()
+    if len(vecs) == 0:
+        raise SystemExit(f"Index for '{topic}' is empty")
+
+    rng = np.random.default_rng(0)
+    q = vecs[rng.choice(len(vecs), min(n_queries, len(vecs)), replace=False)]
+
+    # Exact ground truth, under the index's own metric
+    exact = faiss.IndexFlatIP(store.dim) if store.metric == "ip" else faiss.IndexFlatL2(store.dim)
+    exact.add(vecs)
+    _, truth_pos = exact.search(q, k)
+    truth = ids[truth_pos]
+
+    rows = []
+    for kind, build_params, sweep in CONFIGS:
+        try:
+            t0 = time.perf_counter()
+            tmp = FaissStore(dim=store.dim, path=Path("/dev/null"), metric=store.metric)
+            tmp.index = make_index("flat", store.dim, metric=store.metric)
+            tmp.index.add_with_ids(vecs, ids)
+            if kind != "flat":
+                tmp.promote(kind, **build_params)
+            build_s = time.perf_counter() - t0
+        except Exception as e:
+            rows.append({"kind": kind, "params": build_params, "error": repr(e)})
+            continue
+
+        for search_params in sweep:
+            params = tmp._search_params(
+                search_params.get("nprobe"), search_params.get("ef_search")
+            )
+            t0 = time.perf_counter()
+            for row in q:
+                if params is None:
+                    tmp.index.search(row[None, :], k)
+                else:
+                    tmp.index.search(row[None, :], k, params=params)
+            latency_ms = (time.perf_counter() - t0) * 1000 / len(q)
+
+            if params is None:
+                _, found = tmp.index.search(q, k)
+            else:
+                _, found = tmp.index.search(q, k, params=params)
+
+            rows.append({
+                "kind": kind,
+                "params": {**build_params, **search_params},
+                f"recall@{k}": round(_recall(found, truth), 4),
+                "latency_ms": round(latency_ms, 4),
+                "build_s": round(build_s, 3),
+            })
+
+    return {
+        "topic": _normalize_topic(topic),
+        "ntotal": int(len(vecs)),
+        "dim": store.dim,
+        "current_kind": store.kind,
+        "metric": store.metric,
+        "k": k,
+        "queries": int(len(q)),
+        "results": rows,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Recall@k vs latency for FAISS index types on one topic."
+    )
+    parser.add_argument("topic")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--apply", choices=["flat", "ivf_flat", "ivf_pq", "hnsw"],
+                        help="rebuild the topic index as this kind")
+    parser.add_argument("--nprobe", type=int, help="default nprobe to store with --apply")
+    parser.add_argument("--ef-search", type=int, help="default efSearch to store with --apply")
+    args = parser.parse_args()
+
+    report = benchmark(args.topic, args.k, args.queries)
+
+    print(f"topic={report['topic']} ntotal={report['ntotal']} current={report['current_kind']}")
+    print(f"{'kind':<10} {'params':<32} {'recall':>8} {'ms/query':>10}")
+    for r in report["results"]:
+        if "error" in r:
+            print(f"{r['kind']:<10} {json.dumps(r['params']):<32} FAILED: {r['error']}")
+            continue
+        print(
+            f"{r['kind']:<10} {json.dumps(r['params']):<32} "
+            f"{r[f'recall@{args.k}']:>8.4f} {r['latency_ms']:>10.4f}"
+        )
+
+    out = FAISS_DIR / f"{report['topic']}.bench.json"
+    out.write_text(json.dumps(report, indent=2))
+    print("Report written to", out)
+
+    if args.apply:
+        store = FaissStore.from_topic(args.topic, mmap=False)
+        if args.apply != store.kind:
+            store.promote(args.apply)
+        store.configure_search(args.nprobe, args.ef_search)
+        store.save()
+        print(f"[APPLY] {args.topic} -> {store.kind} ({store.meta()})")
+
+
+if __name__ == "__main__":
+    main()
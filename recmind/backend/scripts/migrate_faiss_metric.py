@@ -0,0 +1,57 @@
+import argparse
+import sys
+from pathlib import Path
+
+# Add project root to PYTHONPATH
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT))
+
+from backend.config import get_settings
+from backend.core.faiss_store import METRICS, FaissStore
+from backend.core.paths import FAISS_DIR
+
+settings = get_settings()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Rebuild FAISS indexes under another metric (default: settings.FAISS_METRIC)."
+    )
+    parser.add_argument("topics", nargs="*", help="topics to migrate (default: all)")
+    parser.add_argument("--metric", choices=METRICS, default=settings.FAISS_METRIC)
+    parser.add_argument("--dry-run", action="store_true", help="only report current metrics")
+    args = parser.parse_args()
+
+    if args.topics:
+        paths = [FAISS_DIR / f"{t}.index" for t in args.topics]
+    else:
+        paths = sorted(FAISS_DIR.glob("*.index"))
+    if not paths:
+        print(f"[SKIP] No FAISS indexes in {FAISS_DIR}")
+        return
+
+    for path in paths:
+        try:
+            store = FaissStore.from_path(path, mmap=False)
+        except Exception as e:
+            print(f"[FAIL] {path.name}: {e!r}")
+            continue
+
+        if store.metric == args.metric:
+            print(f"[OK] {path.name}: already {store.metric}")
+            continue
+        if args.dry_run:
+            print(f"[TODO] {path.name}: {store.kind} {store.metric} -> {args.metric}")
+            continue
+
+        if store.kind == "ivf_pq":
+            print(f"[WARN] {path.name}: re-encoding ivf_pq from its lossy reconstructions")
+
+        # Same layout and parameters, vectors and ids carried over
+        store.promote(store.kind, metric=args.metric, **store.params)
+        store.save()
+        print(f"[MIGRATED] {path.name}: {store.kind} -> {store.metric} ({store.index.ntotal} vectors)")
+
+
+if __name__ == "__main__":
+    main()
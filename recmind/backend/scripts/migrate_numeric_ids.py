@@ -0,0 +1,106 @@
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+# Add project root to PYTHONPATH
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT))
+
+import numpy as np
+
+from backend.core import db
+from backend.core.faiss_store import FaissStore
+
+
+def migrate_topic(topic: str) -> str:
+    """
+    Move one topic from ObjectId-derived ids to sequence-allocated ids.
+
+    Mongo is rewritten first and keeps the old id in `legacy_numeric_id`,
+    so re-running after an interruption still maps the FAISS vectors.
+    """
+    docs = db.get_topic_numeric_ids(topic)
+
+    # old (FAISS) id -> docs of this topic that claim it
+    claims = defaultdict(list)
+    for d in docs:
+        old = d.get("legacy_numeric_id")
+        if old is None:
+            num_id = d.get("numeric_id")
+            if num_id is not None and num_id >= db.NUMERIC_ID_BASE:
+                continue  # indexed with a sequence id already
+            old = num_id if num_id is not None else db.legacy_numeric_id(d["_id"])
+        claims[old].append(d)
+
+    if not claims:
+        return "already migrated"
+
+    # Several docs of one topic with the same old id: the vector cannot be
+    # attributed, so those items are re-embedded on the next build_index.
+    ambiguous = {old for old, ds in claims.items() if len(ds) > 1}
+
+    pending = [d for ds in claims.values() for d in ds if d.get("legacy_numeric_id") is None]
+    new_ids = iter(db.allocate_numeric_ids(len(pending)))
+
+    updates = []
+    old_to_new = {}
+    for old, ds in claims.items():
+        for d in ds:
+            if d.get("legacy_numeric_id") is None:
+                new_id = next(new_ids)
+                updates.append({
+                    "_id": d["_id"],
+                    "numeric_id": new_id,
+                    "legacy_numeric_id": old,
+                    "reembed": old in ambiguous,
+                })
+            else:
+                new_id = d["numeric_id"]
+            if old not in ambiguous:
+                old_to_new[old] = new_id
+
+    db.rewrite_numeric_ids(updates)
+
+    # ------------- Rewrite the FAISS index -------------
+    try:
+        store = FaissStore.from_topic(topic, mmap=False)
+    except FileNotFoundError:
+        return f"{len(updates)} docs updated, no FAISS index"
+
+    vecs, ids = store.all_vectors()
+    legacy = ids < db.NUMERIC_ID_BASE
+    if not legacy.any():
+        return f"{len(updates)} docs updated, index already migrated"
+
+    # Sequence ids (added by builds since) stay; legacy ids are remapped or dropped
+    mapped = np.array(
+        [i if i >= db.NUMERIC_ID_BASE else old_to_new.get(i, -1) for i in ids.tolist()],
+        dtype="int64",
+    )
+    keep = mapped != -1
+
+    new = FaissStore(dim=store.dim, path=store.path, metric=store.metric)
+    new.ondisk = store.ondisk
+    new.upsert(vecs[keep], mapped[keep])
+    if store.kind != "flat":
+        new.promote(store.kind, **store.params)
+    new.configure_search(store.nprobe, store.ef_search)
+    new.save()
+
+    return (
+        f"{len(updates)} docs updated, {int((keep & legacy).sum())} vectors remapped, "
+        f"{int((~keep).sum())} dropped ({len(ambiguous)} ambiguous ids)"
+    )
+
+
+def main():
+    topics = db._get_db()["items"].distinct("topic")
+    for topic in topics:
+        try:
+            print(f"[OK] {topic}: {migrate_topic(topic)}")
+        except Exception as e:
+            print(f"[FAIL] {topic}: {e!r}")
+
+
+if __name__ == "__main__":
+    main()
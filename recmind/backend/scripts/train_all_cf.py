@@ -1,43 +1,53 @@
+import argparse
 import sys
+import time
 from pathlib import Path
 
 # 🔑 Add project root (recmind) to PYTHONPATH
 ROOT = Path(__file__).resolve().parents[2]
 sys.path.insert(0, str(ROOT))
 
-from backend.recommender.cf import CFModel
-from backend.core.faiss_store import FaissStore
-from backend.core import db
-
-
-def normalize_topic(topic: str) -> str:
-    return (
-        topic.strip()
-        .lower()
-        .replace(" ", "_")
-        .replace("/", "_")
-    )
+from backend.recommender.cf_training import REPORT_PATH, train_all
 
 
 def main():
-    topics = db._get_db()["items"].distinct("topic")
-
-    for raw_topic in topics:
-        
-
-        try:
-            faiss = FaissStore.from_topic(raw_topic)
-        except FileNotFoundError:
-            print(f"[SKIP] No FAISS index for topic: {raw_topic}")
-            continue
-
-        cf = CFModel(raw_topic, faiss)
-
-        if not cf.is_trained() or cf.is_stale(days=15):
-            print(f"[TRAIN] Training CF for topic: {raw_topic}")
-            cf.fit()
-        else:
-            print(f"[SKIP] Model fresh for topic: {raw_topic}")
+    parser = argparse.ArgumentParser(
+        description="Retrain CF models of topics with enough new interactions, in parallel."
+    )
+    parser.add_argument("topics", nargs="*", help="topics to consider (default: all)")
+    parser.add_argument("--workers", type=int, default=None, help="topics trained at once")
+    parser.add_argument("--threads", type=int, default=None, help="LightFM threads per topic")
+    parser.add_argument("--force", action="store_true", help="full retrain regardless of new signal")
+    parser.add_argument(
+        "--loop", type=float, default=None, metavar="SECONDS",
+        help="keep running, starting a new pass every SECONDS",
+    )
+    args = parser.parse_args()
+
+    while True:
+        started = time.monotonic()
+        report = train_all(
+            topics=args.topics or None,
+            workers=args.workers,
+            threads=args.threads,
+            force=args.force,
+        )
+
+        print(
+            f"Trained: {report['trained']} (updates: {report['updated']}) "
+            f"| failed: {report['failed']} | skipped: {report['skipped']} "
+            f"| {report['duration_s']}s"
+        )
+        print("Report:", REPORT_PATH)
+
+        if args.loop is None:
+            break
+        # --force only applies to the first pass
+        args.force = False
+        time.sleep(max(0.0, args.loop - (time.monotonic() - started)))
+
+    if report["failed"]:
+        sys.exit(1)
 
 
 if __name__ == "__main__":